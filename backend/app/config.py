@@ -6,10 +6,10 @@ using Pydantic for validation and type safety.
 """
 
 import os
-from functools import lru_cache
+from functools import cache
 from typing import Optional
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, model_validator
 
 
 class Settings(BaseSettings):
@@ -35,12 +35,12 @@ class Settings(BaseSettings):
     environment: str = Field(default="development", description="Environment (development/production)")
     
     # Supabase Configuration
-    supabase_url: str = Field(
-        default="",
+    supabase_url: Optional[str] = Field(
+        default=None,
         description="Supabase project URL (set via SUPABASE_URL env var)"
     )
-    supabase_key: str = Field(
-        default="",
+    supabase_key: Optional[str] = Field(
+        default=None,
         description="Supabase anonymous key (set via SUPABASE_KEY env var)"
     )
     supabase_service_key: Optional[str] = Field(
@@ -84,6 +84,13 @@ class Settings(BaseSettings):
     # Rate Limiting
     rate_limit_requests: int = Field(default=100, description="Max requests per minute")
     
+    @model_validator(mode='after')
+    def _require_supabase_in_production(self) -> 'Settings':
+        """Secrets have no defaults; production must inject them via env."""
+        if self.environment == "production" and not (self.supabase_url and self.supabase_key):
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in production")
+        return self
+    
     class Config:
         # Load backend/.env relative to *this* file so the correct .env is
         # used regardless of the working directory the server is started from.
@@ -98,12 +105,12 @@ class Settings(BaseSettings):
         populate_by_name = True
 
 
-@lru_cache()
+@cache
 def get_settings() -> Settings:
     """
     Get cached settings instance.
     
-    Uses LRU cache to ensure settings are only loaded once.
+    Uses functools.cache to ensure settings are only loaded once.
     
     Returns:
         Settings: Application settings instance
@@ -9,13 +9,15 @@ This module initializes the FastAPI application and mounts all API routers.
 
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import APIRouter, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
+import orjson
 
 # Ensure absolute package imports work whether running as a package or script.
 import sys
@@ -55,8 +57,10 @@ async def lifespan(app: FastAPI):
     if os.path.exists(model_path):
         logger.info(f"ML Model found: {model_path}")
         try:
-            from app.services.ml_model import MLClassifier
-            clf = MLClassifier(model_type='random_forest', model_path=model_path)
+            # Warm the shared classifier so the model is deserialized once here
+            # and reused by every request through get_classifier()
+            from app.services.ml_model import get_classifier
+            clf = get_classifier()
             info = clf.get_model_info()
             logger.info(f"Model Info: Type={info['model_type']}, Trained={info['is_trained']}, Accuracy={info['accuracy']}")
         except Exception as e:
@@ -73,9 +77,21 @@ async def lifespan(app: FastAPI):
             logger.error(f"Auto-training failed (non-critical): {e}")
             logger.info("The API will still work — ML predictions will use an untrained model.")
     
+    # Coalesce concurrent Supabase inserts into batched requests
+    from app.models.database import get_db
+    db = get_db()
+    db.start_insert_batcher()
+    
+    # Coalesce concurrent single-point ML predictions into batched model calls
+    from app.services.ml_model import get_classifier
+    classifier = get_classifier()
+    classifier.start_prediction_batcher()
+    
     yield
     
     # Shutdown
+    await classifier.stop_prediction_batcher()
+    await db.stop_insert_batcher()
     logger.info("Shutting down Fake Productivity Detector API")
 
 
@@ -126,6 +142,7 @@ app = FastAPI(
     license_info={
         "name": "MIT License",
     },
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -144,7 +161,7 @@ app.add_middleware(
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle uncaught exceptions."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "error": "Internal server error",
@@ -154,6 +171,54 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+# Status endpoints share a timestamp that is re-formatted at most once a second
+_timestamp_cache = [0.0, ""]
+
+
+def _utc_timestamp() -> str:
+    """Return the current UTC time in ISO format, cached for one second."""
+    now = time.time()
+    if now - _timestamp_cache[0] >= 1.0:
+        _timestamp_cache[0] = now
+        _timestamp_cache[1] = datetime.utcfromtimestamp(now).isoformat()
+    return _timestamp_cache[1]
+
+
+# Static response bodies, serialized once at import. /info never changes and
+# /health only appends the current timestamp to a fixed prefix.
+_INFO_BYTES = orjson.dumps({
+    "name": "Fake Productivity Detector API",
+    "version": "1.0.0",
+    "description": "Academic project for detecting fake productivity using data science",
+    "features": [
+        "Rule-based productivity scoring",
+        "ML-based classification",
+        "CSV batch processing",
+        "History management",
+        "Analytics reports"
+    ],
+    "scoring": {
+        "formula": "score = (task_hours * 8) + (tasks_completed * 5) - (idle_hours * 6) - (social_media_hours * 7) - (break_frequency * 2)",
+        "categories": {
+            "highly_productive": "80-100",
+            "moderately_productive": "50-79",
+            "fake_productivity": "0-49"
+        }
+    },
+    "endpoints": {
+        "analysis": "/api/v1/analyze",
+        "csv_upload": "/api/v1/upload-csv",
+        "history": "/api/v1/history",
+        "reports": "/api/v1/reports"
+    }
+})
+
+_HEALTH_PREFIX = orjson.dumps({
+    "status": "healthy",
+    "environment": settings.environment
+})[:-1] + b',"timestamp":"'
+
+
 # Health check endpoint
 @app.get(
     "/",
@@ -167,7 +232,7 @@ async def root():
         "message": "Fake Productivity Detector API",
         "version": "1.0.0",
         "status": "running",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _utc_timestamp()
     }
 
 
@@ -179,11 +244,10 @@ async def root():
 )
 async def health_check():
     """Health check endpoint for monitoring."""
-    return {
-        "status": "healthy",
-        "environment": settings.environment,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    return Response(
+        content=_HEALTH_PREFIX + _utc_timestamp().encode() + b'"}',
+        media_type="application/json"
+    )
 
 
 @app.get(
@@ -194,54 +258,14 @@ async def health_check():
 )
 async def api_info():
     """Get detailed API information."""
-    return {
-        "name": "Fake Productivity Detector API",
-        "version": "1.0.0",
-        "description": "Academic project for detecting fake productivity using data science",
-        "features": [
-            "Rule-based productivity scoring",
-            "ML-based classification",
-            "CSV batch processing",
-            "History management",
-            "Analytics reports"
-        ],
-        "scoring": {
-            "formula": "score = (task_hours * 8) + (tasks_completed * 5) - (idle_hours * 6) - (social_media_hours * 7) - (break_frequency * 2)",
-            "categories": {
-                "highly_productive": "80-100",
-                "moderately_productive": "50-79",
-                "fake_productivity": "0-49"
-            }
-        },
-        "endpoints": {
-            "analysis": "/api/v1/analyze",
-            "csv_upload": "/api/v1/upload-csv",
-            "history": "/api/v1/history",
-            "reports": "/api/v1/reports"
-        }
-    }
+    return Response(content=_INFO_BYTES, media_type="application/json")
 
 
-# Mount API routers with /api/v1 prefix
-app.include_router(
-    analysis.router,
-    prefix="/api/v1"
-)
-
-app.include_router(
-    csv_upload.router,
-    prefix="/api/v1"
-)
-
-app.include_router(
-    history.router,
-    prefix="/api/v1"
-)
-
-app.include_router(
-    reports.router,
-    prefix="/api/v1"
-)
+# Mount API routers under a single /api/v1 parent
+api_router = APIRouter(prefix="/api/v1")
+for module in (analysis, csv_upload, history, reports):
+    api_router.include_router(module.router)
+app.include_router(api_router)
 
 
 # Development server entry point
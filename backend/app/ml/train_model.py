@@ -14,6 +14,8 @@ from typing import Optional
 
 import numpy as np
 import pandas as pd
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
 
 # Add parent directory to path for imports when running as script
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,12 +24,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 try:
     from app.services.ml_model import MLClassifier
     from app.services.preprocessing import DataPreprocessor
-    from app.services.scoring import ProductivityScorer
     from app.config import ScoringConfig, ProductivityCategory
 except ImportError:
     from ..services.ml_model import MLClassifier
     from ..services.preprocessing import DataPreprocessor
-    from ..services.scoring import ProductivityScorer
     from ..config import ScoringConfig, ProductivityCategory
 
 logging.basicConfig(
@@ -37,6 +37,56 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Value ranges for synthetic profiles, one entry per productivity cluster:
+# (task_hours, tasks_completed, idle_hours, social_media_usage, break_frequency).
+# Integer columns use an exclusive upper bound.
+_CLUSTER_PROFILES = (
+    # Highly Productive
+    ((6, 10), (5, 15), (0, 2), (0, 1.5), (1, 4)),
+    # Moderately Productive
+    ((3, 6), (2, 8), (1, 4), (1, 3), (3, 7)),
+    # Fake Productivity
+    ((0, 3), (0, 3), (3, 8), (2, 6), (5, 12)),
+)
+
+# Category lookup for vectorized labelling: searchsorted (side='right') over the
+# ascending minimum scores maps a score to its index in _CATEGORY_LABELS.
+_CATEGORY_THRESHOLDS = np.array([
+    ScoringConfig.MODERATELY_PRODUCTIVE_MIN,
+    ScoringConfig.HIGHLY_PRODUCTIVE_MIN,
+], dtype=np.float64)
+_CATEGORY_LABELS = np.array([
+    ProductivityCategory.FAKE_PRODUCTIVITY,
+    ProductivityCategory.MODERATELY_PRODUCTIVE,
+    ProductivityCategory.HIGHLY_PRODUCTIVE,
+], dtype=object)
+
+
+def _add_scores(df: pd.DataFrame) -> None:
+    """
+    Add productivity_score and category columns to a DataFrame in place.
+    
+    Applies the rule-based scoring formula to whole columns at once, giving
+    the same results as ProductivityScorer.calculate_score row by row.
+    
+    Args:
+        df: DataFrame with the five activity feature columns
+    """
+    raw_score = (
+        df['task_hours'].to_numpy() * ScoringConfig.TASK_WEIGHT
+        + df['tasks_completed'].to_numpy() * ScoringConfig.TASKS_COMPLETED_WEIGHT
+        - df['idle_hours'].to_numpy() * ScoringConfig.IDLE_WEIGHT
+        - df['social_media_usage'].to_numpy() * ScoringConfig.SOCIAL_MEDIA_WEIGHT
+        - df['break_frequency'].to_numpy() * ScoringConfig.BREAK_WEIGHT
+    )
+    scores = np.round(np.clip(raw_score, ScoringConfig.MIN_SCORE, ScoringConfig.MAX_SCORE), 2)
+    
+    df['productivity_score'] = scores
+    df['category'] = _CATEGORY_LABELS[
+        np.searchsorted(_CATEGORY_THRESHOLDS, scores, side='right')
+    ]
+
+
 def generate_synthetic_data(n_samples: int = 1000, random_state: int = 42) -> pd.DataFrame:
     """
     Generate synthetic productivity data for training.
@@ -51,68 +101,40 @@ def generate_synthetic_data(n_samples: int = 1000, random_state: int = 42) -> pd
     Returns:
         DataFrame with synthetic productivity data
     """
-    np.random.seed(random_state)
-    
-    data = {
-        'task_hours': [],
-        'tasks_completed': [],
-        'idle_hours': [],
-        'social_media_usage': [],
-        'break_frequency': []
-    }
+    rng = np.random.default_rng(random_state)
     
     # Generate three clusters of data (one for each productivity category)
-    samples_per_category = n_samples // 3
-    
-    # Highly Productive profiles
-    for _ in range(samples_per_category):
-        data['task_hours'].append(np.random.uniform(6, 10))
-        data['tasks_completed'].append(np.random.randint(5, 15))
-        data['idle_hours'].append(np.random.uniform(0, 2))
-        data['social_media_usage'].append(np.random.uniform(0, 1.5))
-        data['break_frequency'].append(np.random.randint(1, 4))
-    
-    # Moderately Productive profiles
-    for _ in range(samples_per_category):
-        data['task_hours'].append(np.random.uniform(3, 6))
-        data['tasks_completed'].append(np.random.randint(2, 8))
-        data['idle_hours'].append(np.random.uniform(1, 4))
-        data['social_media_usage'].append(np.random.uniform(1, 3))
-        data['break_frequency'].append(np.random.randint(3, 7))
-    
-    # Fake Productivity profiles
-    remaining = n_samples - (2 * samples_per_category)
-    for _ in range(remaining):
-        data['task_hours'].append(np.random.uniform(0, 3))
-        data['tasks_completed'].append(np.random.randint(0, 3))
-        data['idle_hours'].append(np.random.uniform(3, 8))
-        data['social_media_usage'].append(np.random.uniform(2, 6))
-        data['break_frequency'].append(np.random.randint(5, 12))
-    
-    df = pd.DataFrame(data)
-    
-    # Shuffle the data
-    df = df.sample(frac=1, random_state=random_state).reset_index(drop=True)
-    
-    # Calculate productivity scores using the scoring service
-    scorer = ProductivityScorer()
-    scores = []
-    categories = []
-    
-    for _, row in df.iterrows():
-        metrics = row.to_dict()
-        result = scorer.calculate_score(
-            metrics["task_hours"],
-            metrics["idle_hours"],
-            metrics.get("social_media_usage", metrics.get("social_media_hours", 0)),
-            metrics["break_frequency"],
-            metrics["tasks_completed"]
-        )
-        scores.append(result.score)
-        categories.append(result.category)
-    
-    df['productivity_score'] = scores
-    df['category'] = categories
+    n = n_samples // 3
+    cluster_sizes = (n, n, n_samples - (2 * n))
+    
+    task_hours = np.empty(n_samples)
+    tasks_completed = np.empty(n_samples, dtype=np.int64)
+    idle_hours = np.empty(n_samples)
+    social_media_usage = np.empty(n_samples)
+    break_frequency = np.empty(n_samples, dtype=np.int64)
+    
+    # Each cluster is written straight into a random subset of rows, so the
+    # result is already shuffled and no DataFrame reorder/copy is needed.
+    perm = rng.permutation(n_samples)
+    start = 0
+    for size, (th, tc, ih, sm, bf) in zip(cluster_sizes, _CLUSTER_PROFILES):
+        rows = perm[start:start + size]
+        task_hours[rows] = rng.uniform(*th, size)
+        tasks_completed[rows] = rng.integers(*tc, size)
+        idle_hours[rows] = rng.uniform(*ih, size)
+        social_media_usage[rows] = rng.uniform(*sm, size)
+        break_frequency[rows] = rng.integers(*bf, size)
+        start += size
+    
+    df = pd.DataFrame({
+        'task_hours': task_hours,
+        'tasks_completed': tasks_completed,
+        'idle_hours': idle_hours,
+        'social_media_usage': social_media_usage,
+        'break_frequency': break_frequency
+    }, copy=False)
+    
+    _add_scores(df)
     
     logger.info(f"Generated {len(df)} synthetic samples")
     logger.info(f"Category distribution:\n{df['category'].value_counts()}")
@@ -132,14 +154,24 @@ def load_csv_data(filepath: str) -> pd.DataFrame:
     """
     logger.info(f"Loading data from {filepath}")
     
-    df = pd.read_csv(filepath)
-    
     # Required columns
     required_cols = [
         'task_hours', 'tasks_completed', 'idle_hours',
         'social_media_usage', 'break_frequency'
     ]
     
+    # Read the header first so only the columns we use are parsed
+    header = pd.read_csv(filepath, nrows=0).columns
+    normalized = header.str.lower().str.strip().str.replace(' ', '_')
+    wanted = set(required_cols) | {'category'}
+    usecols = [orig for orig, norm in zip(header, normalized) if norm in wanted]
+    
+    try:
+        df = pd.read_csv(filepath, usecols=usecols, engine='pyarrow')
+    except ImportError:
+        # pyarrow is optional; the default C engine gives the same frame
+        df = pd.read_csv(filepath, usecols=usecols)
+    
     # Check for required columns (case-insensitive)
     df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
     
@@ -149,24 +181,7 @@ def load_csv_data(filepath: str) -> pd.DataFrame:
     
     # Add scores and categories if not present
     if 'category' not in df.columns:
-        scorer = ProductivityScorer()
-        scores = []
-        categories = []
-        
-        for _, row in df.iterrows():
-            metrics = {col: row[col] for col in required_cols}
-            result = scorer.calculate_score(
-                metrics["task_hours"],
-                metrics["idle_hours"],
-                metrics.get("social_media_usage", metrics.get("social_media_hours", 0)),
-                metrics["break_frequency"],
-                metrics["tasks_completed"]
-            )
-            scores.append(result.score)
-            categories.append(result.category)
-        
-        df['productivity_score'] = scores
-        df['category'] = categories
+        _add_scores(df)
     
     logger.info(f"Loaded {len(df)} samples from CSV")
     logger.info(f"Category distribution:\n{df['category'].value_counts()}")
@@ -204,12 +219,12 @@ def train_and_evaluate(
         'social_media_usage', 'break_frequency'
     ]
     
-    # Prepare features and labels
-    X = processed_df[feature_cols].values
-    y = processed_df['category'].values
+    # Prepare features and labels (float32 matches the forest's internal
+    # dtype, so fit() does not make its own converted copy)
+    X = processed_df[feature_cols].to_numpy(dtype=np.float32)
+    y = MLClassifier.encode_labels(processed_df['category'])
     
     # Train-test split
-    from sklearn.model_selection import train_test_split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=42, stratify=y
     )
@@ -219,16 +234,15 @@ def train_and_evaluate(
     train_results = classifier.train(X_train, y_train)
     
     # Evaluate on test set
-    from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-    
     y_pred = classifier.model.predict(X_test)
     
     accuracy = accuracy_score(y_test, y_pred)
-    report = classification_report(y_test, y_pred, output_dict=True)
+    target_names = MLClassifier.CATEGORY_CLASSES
+    report = classification_report(y_test, y_pred, target_names=target_names, output_dict=True)
     conf_matrix = confusion_matrix(y_test, y_pred).tolist()
     
     logger.info(f"Test Accuracy: {accuracy:.4f}")
-    logger.info(f"Classification Report:\n{classification_report(y_test, y_pred)}")
+    logger.info(f"Classification Report:\n{classification_report(y_test, y_pred, target_names=target_names)}")
     
     # Save model
     os.makedirs(model_dir, exist_ok=True)
@@ -271,11 +285,10 @@ def compare_models(data: pd.DataFrame, model_dir: str = 'models') -> dict:
         'social_media_usage', 'break_frequency'
     ]
     
-    X = processed_df[feature_cols].values
-    y = processed_df['category'].values
+    X = processed_df[feature_cols].to_numpy(dtype=np.float32)
+    y = MLClassifier.encode_labels(processed_df['category'])
     
     # Train-test split
-    from sklearn.model_selection import train_test_split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
     )
@@ -283,25 +296,22 @@ def compare_models(data: pd.DataFrame, model_dir: str = 'models') -> dict:
     # Train multiple models
     classifier = MLClassifier()
     comparison = classifier.train_and_compare(X_train, y_train)
+    guard = comparison['model_results'].get(MLClassifier.GUARD_MODEL_TYPE, {}).get('model')
     
     results = {}
+    os.makedirs(model_dir, exist_ok=True)
     
-    for model_name, metrics in comparison.items():
-        # Save each trained model
-        os.makedirs(model_dir, exist_ok=True)
-        
-        # Get the model and evaluate on test set
-        temp_classifier = MLClassifier(model_type=model_name)
-        temp_classifier.train(X_train, y_train)
-        
-        y_pred = temp_classifier.model.predict(X_test)
-        
-        from sklearn.metrics import accuracy_score
-        test_accuracy = accuracy_score(y_test, y_pred)
+    for model_name, metrics in comparison['model_results'].items():
+        # Evaluate the already fitted estimator on the held-out test set, as
+        # it will be served (guarded only if the guard does not cost accuracy)
+        classifier.model = metrics['model']
+        classifier.model_type = model_name
+        test_accuracy = classifier.select_guard(guard, X_test, y_test)
         
         # Save model
+        classifier.training_accuracy = test_accuracy
         model_path = os.path.join(model_dir, f'{model_name}_model.joblib')
-        temp_classifier.save_model(model_path)
+        classifier.save_model(model_path)
         
         results[model_name] = {
             'train_accuracy': metrics['accuracy'],
@@ -340,7 +350,7 @@ def main():
         '--model',
         type=str,
         default='random_forest',
-        choices=['logistic_regression', 'random_forest', 'decision_tree'],
+        choices=['logistic_regression', 'random_forest', 'decision_tree', 'hist_gradient_boosting'],
         help='Model type to train (default: random_forest)'
     )
     
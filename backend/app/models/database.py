@@ -5,13 +5,21 @@ This module provides the Supabase client and database operations
 for the Fake Productivity Detector backend.
 """
 
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 import uuid
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from functools import partial
+from itertools import islice
 
-from supabase import create_client, Client
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
+import numpy as np
+from supabase import Client
 
 from ..config import settings, TableNames
 
@@ -19,8 +27,144 @@ from ..config import settings, TableNames
 logger = logging.getLogger(__name__)
 
 # In-memory storage for when Supabase table isn't available
-# This allows history to work during the session for demo purposes
-_in_memory_history: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+# This allows history to work during the session for demo purposes.
+# Newest records sit on the left; each user keeps at most the latest 10,000.
+_IN_MEMORY_HISTORY_MAX = 10_000
+_in_memory_history: Dict[str, deque] = defaultdict(
+    partial(deque, maxlen=_IN_MEMORY_HISTORY_MAX)
+)
+
+# Read cache for history queries and analytics summaries, keyed by
+# (kind, user_id, ...). Entries expire after a TTL and are dropped as soon as
+# the user's records change.
+_CACHE_TTL_SECONDS = 60.0
+_CACHE_MAX_ENTRIES = 10_000
+_query_cache: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+# Cached keys per user, so invalidation touches only that user's entries
+_user_cache_keys: Dict[str, set] = defaultdict(set)
+
+
+def _cache_drop(key: Tuple[Any, ...]) -> None:
+    """Remove one entry from the cache and the per-user key index."""
+    if _query_cache.pop(key, None) is None:
+        return
+    keys = _user_cache_keys.get(key[1])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _user_cache_keys[key[1]]
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Optional[Any]:
+    """Return a cached value, or None if missing or expired."""
+    entry = _query_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if time.monotonic() >= expires_at:
+        _cache_drop(key)
+        return None
+    return value
+
+
+def _cache_put(key: Tuple[Any, ...], value: Any) -> None:
+    """Store a value, evicting the oldest entry when the cache is full."""
+    if key not in _query_cache and len(_query_cache) >= _CACHE_MAX_ENTRIES:
+        _cache_drop(next(iter(_query_cache)))
+    _query_cache[key] = (time.monotonic() + _CACHE_TTL_SECONDS, value)
+    _user_cache_keys[key[1]].add(key)
+
+
+def _invalidate_user_cache(user_id: str) -> None:
+    """Drop every cached entry belonging to a user."""
+    for key in _user_cache_keys.pop(user_id, ()):
+        _query_cache.pop(key, None)
+
+
+# Column names used by older tables, mapped to the names this module writes.
+# Records are renamed once when they are read, so callers only ever see the
+# canonical keys.
+_LEGACY_COLUMNS = {
+    "score": "productivity_score",
+    "category": "category_rule_based",
+    "timestamp": "created_at",
+    "social_media_hours": "social_media_usage"
+}
+
+
+def _normalize_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rename legacy column keys in place; current-schema rows are left as is."""
+    for record in records:
+        # Checked per row: a page can mix old and new rows
+        if _LEGACY_COLUMNS.keys().isdisjoint(record):
+            continue
+        for legacy, canonical in _LEGACY_COLUMNS.items():
+            if legacy in record:
+                value = record.pop(legacy)
+                record.setdefault(canonical, value)
+    return records
+
+
+# Columns the analytics summary aggregates; skips the bulky suggestions array
+_SUMMARY_COLUMNS = (
+    "id,user_id,productivity_score,category_rule_based,category_ml,"
+    "task_hours,tasks_completed,idle_hours,social_media_usage,"
+    "break_frequency,created_at"
+)
+
+
+# Connection pool for Supabase REST calls. Keep-alive connections are held for
+# a minute so bursts of inserts/selects reuse open TLS sessions.
+_SUPABASE_HTTP_LIMITS = httpx.Limits(
+    max_connections=50,
+    max_keepalive_connections=20,
+    keepalive_expiry=60
+)
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose HTTP session uses the shared pool limits."""
+    
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Any,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> PostgrestSession:
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            limits=_SUPABASE_HTTP_LIMITS
+        )
+
+
+class _PooledSupabaseClient(Client):
+    """Supabase client that builds its PostgREST client with pooled sessions."""
+    
+    @staticmethod
+    def _init_postgrest_client(
+        rest_url: str,
+        headers: Dict[str, str],
+        schema: str,
+        timeout: Any = 120,
+        verify: bool = True,
+        proxy: Optional[str] = None,
+    ) -> SyncPostgrestClient:
+        return _PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy
+        )
 
 
 class SupabaseClient:
@@ -49,7 +193,7 @@ class SupabaseClient:
                 )
                 return None
             try:
-                cls._instance = create_client(
+                cls._instance = _PooledSupabaseClient.create(
                     settings.supabase_url,
                     settings.supabase_key
                 )
@@ -72,11 +216,148 @@ class ProductivityAnalysisDB:
     Handles all CRUD operations for the productivity_analysis table.
     """
     
+    # Inserts arriving within this window are sent to Supabase as one request
+    INSERT_BATCH_SIZE = 100
+    INSERT_BATCH_WINDOW_SECONDS = 0.02
+    
+    # How often an unreachable main table is probed again
+    MAIN_TABLE_REPROBE_SECONDS = 60.0
+    
     def __init__(self):
         """Initialize with Supabase client."""
         self.client = SupabaseClient.get_client()
         self.table = TableNames.PRODUCTIVITY_ANALYSIS
         self._use_memory = self.client is None
+        # The table request builder only holds the session and path, so one
+        # instance can start every query
+        self._table = None if self._use_memory else self.client.table(self.table)
+        # Whether the main table answered the last probe; while it is down
+        # requests go straight to in-memory storage instead of failing over
+        # one REST call at a time. Only the probe sets this: any other
+        # failed request falls back for that call alone
+        self._main_table_ok = False
+        self._probed_at = 0.0
+        self._reprobe_task: Optional[asyncio.Task] = None
+        if not self._use_memory:
+            self._probe_main_table()
+        self._insert_queue: Optional[asyncio.Queue] = None
+        self._insert_worker: Optional[asyncio.Task] = None
+    
+    def _probe_main_table(self) -> None:
+        """Check that the main table is reachable and record the result."""
+        try:
+            self._table.select("id").limit(1).execute()
+            self._main_table_ok = True
+        except Exception as e:
+            logger.warning(f"Main table {self.table} not reachable, using in-memory storage: {e}")
+            self._main_table_ok = False
+        self._probed_at = time.monotonic()
+    
+    def _main_table_available(self) -> bool:
+        """
+        Whether requests should go to the main table.
+        
+        A failed table is re-probed at most once per MAIN_TABLE_REPROBE_SECONDS,
+        in the background; requests keep using in-memory storage until the
+        probe succeeds.
+        """
+        if self._use_memory:
+            return False
+        if (
+            not self._main_table_ok
+            and self._reprobe_task is None
+            and time.monotonic() - self._probed_at >= self.MAIN_TABLE_REPROBE_SECONDS
+        ):
+            self._reprobe_task = asyncio.get_running_loop().create_task(
+                self._reprobe_main_table()
+            )
+        return self._main_table_ok
+    
+    async def _reprobe_main_table(self) -> None:
+        """Run the main table probe in a worker thread, off the event loop."""
+        try:
+            await asyncio.to_thread(self._probe_main_table)
+        finally:
+            self._reprobe_task = None
+    
+    def start_insert_batcher(self) -> None:
+        """
+        Start the background task that coalesces concurrent inserts.
+        
+        Without it (or with in-memory storage) each record is inserted directly.
+        """
+        if self._use_memory or self._insert_worker is not None:
+            return
+        self._insert_queue = asyncio.Queue()
+        self._insert_worker = asyncio.create_task(self._run_insert_batcher())
+        logger.info("Started Supabase insert batcher")
+    
+    async def stop_insert_batcher(self) -> None:
+        """Stop the insert batcher, flushing any records still queued."""
+        if self._insert_worker is None:
+            return
+        queue, worker = self._insert_queue, self._insert_worker
+        self._insert_queue = None
+        self._insert_worker = None
+        # The sentinel makes the worker insert the batch it is collecting
+        # and exit; cancelling it would drop that batch unresolved
+        await queue.put(None)
+        await worker
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        if pending:
+            await self._insert_batch(pending)
+    
+    async def _run_insert_batcher(self) -> None:
+        """Drain queued inserts in batches until a None sentinel arrives."""
+        loop = asyncio.get_running_loop()
+        queue = self._insert_queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.INSERT_BATCH_WINDOW_SECONDS
+            while len(batch) < self.INSERT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._insert_batch(batch)
+    
+    async def _insert_batch(
+        self,
+        batch: List[Tuple[Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """
+        Insert a batch of records with one Supabase request.
+        
+        Args:
+            batch: (record, future) pairs; each future gets its stored record
+        """
+        records = [record for record, _ in batch]
+        try:
+            response = await asyncio.to_thread(self._table.insert(records).execute)
+            data = response.data or []
+            logger.info(f"Inserted batch of {len(records)} analysis records")
+            for i, (record, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(data[i] if i < len(data) else record)
+        except Exception as e:
+            logger.error(f"Error inserting batch of {len(records)} records: {e}")
+            for record, future in batch:
+                stored = await self._fallback_create(record)
+                if not future.done():
+                    future.set_result(stored)
     
     async def create_analysis(
         self,
@@ -90,7 +371,8 @@ class ProductivityAnalysisDB:
         productivity_score: float,
         category_rule_based: str,
         category_ml: Optional[str] = None,
-        suggestions: Optional[List[str]] = None
+        suggestions: Optional[List[str]] = None,
+        created_at: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create a new productivity analysis record.
@@ -107,6 +389,7 @@ class ProductivityAnalysisDB:
             category_rule_based: Rule-based category classification
             category_ml: ML model category classification
             suggestions: List of improvement suggestions
+            created_at: ISO timestamp already taken by the caller (defaults to now)
             
         Returns:
             Dict containing the created record
@@ -125,13 +408,18 @@ class ProductivityAnalysisDB:
                 "category_rule_based": category_rule_based,
                 "category_ml": category_ml,
                 "suggestions": suggestions or [],
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": created_at or datetime.utcnow().isoformat()
             }
             
-            if self._use_memory:
+            if not self._main_table_available():
                 return await self._fallback_create(record)
             
-            response = self.client.table(self.table).insert(record).execute()
+            if self._insert_queue is not None:
+                future = asyncio.get_running_loop().create_future()
+                await self._insert_queue.put((record, future))
+                return await future
+            
+            response = await asyncio.to_thread(self._table.insert(record).execute)
             logger.info(f"Created analysis record for user {user_id}")
             return response.data[0] if response.data else record
             
@@ -139,6 +427,56 @@ class ProductivityAnalysisDB:
             logger.error(f"Error creating analysis record: {e}")
             # Fallback to KV store if main table doesn't exist
             return await self._fallback_create(record)
+        finally:
+            _invalidate_user_cache(user_id)
+    
+    async def create_analyses_bulk(
+        self,
+        records: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Create many productivity analysis records with a single insert.
+        
+        Records carry the same fields as create_analysis arguments; id,
+        category_ml, suggestions and created_at are filled in when missing.
+        
+        Args:
+            records: Analysis records to store
+            
+        Returns:
+            List of created records, in the same order as the input
+        """
+        if not records:
+            return []
+        
+        now = datetime.utcnow().isoformat()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "category_ml": None,
+                "created_at": now,
+                **record,
+                "suggestions": record.get("suggestions") or []
+            }
+            for record in records
+        ]
+        
+        try:
+            if not self._main_table_available():
+                return [await self._fallback_create(row) for row in rows]
+            
+            # One request, one statement: PostgREST commits the whole batch at once
+            response = await asyncio.to_thread(self._table.insert(rows).execute)
+            data = response.data or []
+            logger.info(f"Bulk inserted {len(rows)} analysis records")
+            return [data[i] if i < len(data) else row for i, row in enumerate(rows)]
+            
+        except Exception as e:
+            logger.error(f"Error bulk inserting {len(rows)} analysis records: {e}")
+            return [await self._fallback_create(row) for row in rows]
+        finally:
+            for user_id in {row["user_id"] for row in rows}:
+                _invalidate_user_cache(user_id)
     
     async def _fallback_create(self, record: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -153,7 +491,7 @@ class ProductivityAnalysisDB:
             Dict containing the record
         """
         user_id = record.get("user_id", "unknown")
-        _in_memory_history[user_id].insert(0, record)  # Insert at beginning (newest first)
+        _in_memory_history[user_id].appendleft(record)  # Newest first
         logger.info(f"Stored analysis in-memory for user {user_id}. Total records: {len(_in_memory_history[user_id])}")
         return record
     
@@ -161,7 +499,8 @@ class ProductivityAnalysisDB:
         self,
         user_id: str,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        columns: str = "*"
     ) -> List[Dict[str, Any]]:
         """
         Get productivity history for a user.
@@ -170,29 +509,119 @@ class ProductivityAnalysisDB:
             user_id: User identifier
             limit: Maximum number of records to return
             offset: Number of records to skip
+            columns: Comma-separated columns to select (Supabase only)
             
         Returns:
             List of analysis records
         """
         try:
-            if self._use_memory:
-                return await self._fallback_get_history(user_id)
+            if not self._main_table_available():
+                return await self._fallback_get_history(user_id, limit, offset)
             
-            response = self.client.table(self.table)\
-                .select("*")\
+            cache_key = ("history", user_id, limit, offset, columns)
+            cached = _cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
+            query = self._table\
+                .select(columns)\
                 .eq("user_id", user_id)\
                 .order("created_at", desc=True)\
                 .limit(limit)\
-                .offset(offset)\
-                .execute()
+                .offset(offset)
+            # The Supabase client is synchronous; run the round trip off the
+            # event loop so concurrent reads can overlap.
+            response = await asyncio.to_thread(query.execute)
             
-            return response.data or []
+            history = _normalize_records(response.data or [])
+            _cache_put(cache_key, history)
+            return history
             
         except Exception as e:
             logger.warning(f"Main table query failed, trying KV store: {e}")
-            return await self._fallback_get_history(user_id)
+            return await self._fallback_get_history(user_id, limit, offset)
+    
+    async def get_user_history_range(
+        self,
+        user_id: str,
+        start: date,
+        end: date,
+        limit: int = 1000,
+        columns: str = "*"
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a user's records created between two dates, inclusive.
+        
+        Args:
+            user_id: User identifier
+            start: First day to include
+            end: Last day to include
+            limit: Maximum number of records to return
+            columns: Comma-separated columns to select (Supabase only)
+            
+        Returns:
+            List of analysis records, newest first
+        """
+        try:
+            if not self._main_table_available():
+                return self._fallback_get_history_range(user_id, start, end, limit)
+            
+            cache_key = ("range", user_id, start, end, limit, columns)
+            cached = _cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
+            query = self._table\
+                .select(columns)\
+                .eq("user_id", user_id)\
+                .gte("created_at", start.isoformat())\
+                .lt("created_at", (end + timedelta(days=1)).isoformat())\
+                .order("created_at", desc=True)\
+                .limit(limit)
+            response = await asyncio.to_thread(query.execute)
+            
+            history = _normalize_records(response.data or [])
+            _cache_put(cache_key, history)
+            return history
+            
+        except Exception as e:
+            logger.warning(f"Main table range query failed, using in-memory storage: {e}")
+            return self._fallback_get_history_range(user_id, start, end, limit)
     
-    async def _fallback_get_history(self, user_id: str) -> List[Dict[str, Any]]:
+    def _fallback_get_history_range(
+        self,
+        user_id: str,
+        start: date,
+        end: date,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter in-memory history to records created between two dates.
+        
+        Args:
+            user_id: User identifier
+            start: First day to include
+            end: Last day to include
+            limit: Maximum number of records to return
+            
+        Returns:
+            List of matching analysis records from in-memory storage
+        """
+        first, last = start.isoformat(), end.isoformat()
+        return list(islice(
+            (
+                record for record in _in_memory_history.get(user_id, ())
+                if first <= str(record.get('created_at') or '')[:10] <= last
+            ),
+            limit
+        ))
+    
+    async def _fallback_get_history(
+        self,
+        user_id: str,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
         """
         Fallback when database is not accessible.
         
@@ -200,11 +629,13 @@ class ProductivityAnalysisDB:
         
         Args:
             user_id: User identifier
+            limit: Maximum number of records to return
+            offset: Number of records to skip
             
         Returns:
             List of analysis records from in-memory storage
         """
-        history = _in_memory_history.get(user_id, [])
+        history = list(islice(_in_memory_history.get(user_id, ()), offset, offset + limit))
         logger.info(f"Retrieved {len(history)} records from in-memory storage for user {user_id}")
         return history
     
@@ -219,14 +650,14 @@ class ProductivityAnalysisDB:
             Number of deleted records
         """
         try:
-            if self._use_memory:
+            if not self._main_table_available():
                 return await self._fallback_delete_history(user_id)
             
             # Try main table first
-            response = self.client.table(self.table)\
+            query = self._table\
                 .delete()\
-                .eq("user_id", user_id)\
-                .execute()
+                .eq("user_id", user_id)
+            response = await asyncio.to_thread(query.execute)
             
             deleted_count = len(response.data) if response.data else 0
             logger.info(f"Deleted {deleted_count} records for user {user_id}")
@@ -235,6 +666,8 @@ class ProductivityAnalysisDB:
         except Exception as e:
             logger.warning(f"Main table delete failed, trying KV store: {e}")
             return await self._fallback_delete_history(user_id)
+        finally:
+            _invalidate_user_cache(user_id)
     
     async def _fallback_delete_history(self, user_id: str) -> int:
         """
@@ -248,11 +681,41 @@ class ProductivityAnalysisDB:
         Returns:
             Number of records deleted from in-memory storage
         """
-        count = len(_in_memory_history.get(user_id, []))
-        _in_memory_history[user_id] = []
+        count = len(_in_memory_history.get(user_id, ()))
+        _in_memory_history.pop(user_id, None)
         logger.info(f"Deleted {count} records from in-memory storage for user {user_id}")
         return count
     
+    def get_cached_report(self, user_id: str, kind: str, *params: Any) -> Optional[Dict[str, Any]]:
+        """
+        Get a previously built report from the read cache.
+        
+        Reports are bucketed by UTC day because their date ranges are
+        relative to today; like other cached reads they are dropped as soon
+        as the user's records change.
+        
+        Args:
+            user_id: User identifier
+            kind: Report name
+            *params: Query parameters the report was built with
+            
+        Returns:
+            The cached report, or None on a miss
+        """
+        return _cache_get(("report", user_id, kind, params, datetime.utcnow().date()))
+    
+    def cache_report(self, user_id: str, kind: str, report: Dict[str, Any], *params: Any) -> None:
+        """
+        Store a built report in the read cache.
+        
+        Args:
+            user_id: User identifier
+            kind: Report name
+            report: Report to store
+            *params: Query parameters the report was built with
+        """
+        _cache_put(("report", user_id, kind, params, datetime.utcnow().date()), report)
+    
     async def get_analytics_summary(self, user_id: str) -> Dict[str, Any]:
         """
         Get analytics summary for a user.
@@ -263,19 +726,303 @@ class ProductivityAnalysisDB:
         Returns:
             Dict containing analytics summary
         """
-        history = await self.get_user_history(user_id, limit=1000)
+        cache_key = ("summary", user_id)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        summary = None
+        if self._main_table_available():
+            summary = await self._fetch_analytics_summary(user_id)
+        if summary is None:
+            summary = await self._compute_analytics_summary(user_id)
+        _cache_put(cache_key, summary)
+        return summary
+    
+    async def get_user_stats(
+        self,
+        user_id: str,
+        sample_limit: int = 1000
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get score statistics and category counts over a user's recent records.
+        
+        With Supabase the aggregation runs in Postgres via the get_user_stats
+        RPC; otherwise (or if the function is missing) it is computed here
+        from the two needed columns.
+        
+        Args:
+            user_id: User identifier
+            sample_limit: Number of most recent records to aggregate
+            
+        Returns:
+            Dict with count, mean, median, stdev, min, max and
+            category_breakdown, or None if the user has no records
+        """
+        cache_key = ("stats", user_id, sample_limit)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
         
-        if not history:
+        stats = None
+        if self._main_table_available():
+            try:
+                response = await asyncio.to_thread(
+                    self.client.rpc(
+                        "get_user_stats", {"uid": user_id, "sample_limit": sample_limit}
+                    ).execute
+                )
+                stats = response.data or None
+            except Exception as e:
+                logger.warning(f"Stats RPC failed, aggregating in Python: {e}")
+        
+        if stats is None:
+            history = await self.get_user_history(
+                user_id,
+                limit=sample_limit,
+                columns="productivity_score,category_rule_based"
+            )
+            if not history:
+                return None
+            
+            scores = np.fromiter(
+                (r.get('productivity_score') or 0 for r in history),
+                dtype=np.float64,
+                count=len(history)
+            )
+            stats = {
+                "count": len(scores),
+                "mean": round(float(scores.mean()), 2),
+                "median": round(float(np.median(scores)), 2),
+                "stdev": round(float(scores.std(ddof=1)), 2) if len(scores) > 1 else 0,
+                "min": round(float(scores.min()), 2),
+                "max": round(float(scores.max()), 2),
+                "category_breakdown": dict(Counter(
+                    r.get('category_rule_based') or 'Unknown' for r in history
+                ))
+            }
+        
+        _cache_put(cache_key, stats)
+        return stats
+    
+    async def get_daily_averages(
+        self,
+        user_id: str,
+        sample_limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        Get per-day average scores over a user's recent records.
+        
+        With Supabase the grouping runs in Postgres via the get_daily_averages
+        RPC; otherwise (or if the function is missing) it is computed here
+        from the two needed columns.
+        
+        Args:
+            user_id: User identifier
+            sample_limit: Number of most recent records to group
+            
+        Returns:
+            List of dicts with date, average_score and analyses_count,
+            oldest day first
+        """
+        cache_key = ("daily", user_id, sample_limit)
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
+        daily = None
+        if self._main_table_available():
+            try:
+                response = await asyncio.to_thread(
+                    self.client.rpc(
+                        "get_daily_averages", {"uid": user_id, "sample_limit": sample_limit}
+                    ).execute
+                )
+                daily = response.data
+            except Exception as e:
+                logger.warning(f"Daily averages RPC failed, grouping in Python: {e}")
+        
+        if daily is None:
+            history = await self.get_user_history(
+                user_id,
+                limit=sample_limit,
+                columns="productivity_score,created_at"
+            )
+            
+            stamps = np.array(
+                [str(r.get('created_at') or '')[:10] for r in history],
+                dtype=str
+            )
+            scores = np.fromiter(
+                (r.get('productivity_score') or 0 for r in history),
+                dtype=np.float64,
+                count=len(history)
+            )
+            dated = stamps != ''
+            
+            # np.unique sorts the days and labels each record with its day,
+            # so one bincount gives every day's total
+            day_keys, day_index, counts = np.unique(
+                stamps[dated], return_inverse=True, return_counts=True
+            )
+            means = np.bincount(day_index, weights=scores[dated], minlength=len(day_keys)) / counts
+            
+            daily = [
+                {
+                    "date": str(date_key),
+                    "average_score": round(float(mean), 2),
+                    "analyses_count": int(count)
+                }
+                for date_key, mean, count in zip(day_keys, means, counts)
+            ]
+        
+        _cache_put(cache_key, daily)
+        return daily
+    
+    async def _fetch_analytics_summary(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate the summary in Postgres via the get_productivity_summary RPC.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Dict containing analytics summary, or None if the function is not
+            installed or the user has no records
+        """
+        try:
+            response = await asyncio.to_thread(
+                self.client.rpc("get_productivity_summary", {"uid": user_id}).execute
+            )
+            return response.data or None
+        except Exception as e:
+            logger.warning(f"Summary RPC failed, aggregating in Python: {e}")
+            return None
+    
+    async def iter_user_history(
+        self,
+        user_id: str,
+        limit: int = 1000,
+        batch_size: int = 100,
+        columns: str = "*"
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Page through a user's history, newest first.
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum number of records to read in total
+            batch_size: Records fetched per query
+            columns: Comma-separated columns to select (Supabase only)
+            
+        Yields:
+            Lists of at most batch_size analysis records
+        """
+        offset = 0
+        while offset < limit:
+            size = min(batch_size, limit - offset)
+            batch = await self.get_user_history(
+                user_id, limit=size, offset=offset, columns=columns
+            )
+            if batch:
+                yield batch
+            if len(batch) < size:
+                break
+            offset += size
+    
+    async def get_user_history_csv(
+        self,
+        user_id: str,
+        limit: int,
+        columns: str
+    ) -> Optional[str]:
+        """
+        Get a user's most recent records rendered as CSV by PostgREST.
+        
+        Args:
+            user_id: User identifier
+            limit: Maximum number of records to include
+            columns: PostgREST select list; aliases become the CSV headers
+            
+        Returns:
+            CSV text with a header row, or None if Supabase is unavailable
+            or the request fails
+        """
+        if not self._main_table_available():
+            return None
+        
+        try:
+            query = self._table\
+                .select(columns)\
+                .eq("user_id", user_id)\
+                .order("created_at", desc=True)\
+                .limit(limit)\
+                .csv()
+            response = await asyncio.to_thread(query.execute)
+            return response.data
+        except Exception as e:
+            logger.warning(f"CSV export query failed, formatting rows in Python: {e}")
+            return None
+    
+    async def _compute_analytics_summary(self, user_id: str) -> Dict[str, Any]:
+        """
+        Build the analytics summary from the user's history.
+        
+        History is consumed in pages so only one batch of full records is held
+        at a time; per page the numeric columns are reduced with NumPy.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Dict containing analytics summary
+        """
+        category_counts = {
+            "Highly Productive": 0,
+            "Moderately Productive": 0,
+            "Fake Productivity": 0
+        }
+        score_chunks: List[np.ndarray] = []
+        # task_hours, tasks_completed, idle_hours, social media, break_frequency
+        metric_sums = np.zeros(5, dtype=np.float64)
+        highest = float("-inf")
+        lowest = float("inf")
+
+        async for batch in self.iter_user_history(
+            user_id, limit=1000, columns=_SUMMARY_COLUMNS
+        ):
+            block = np.array(
+                [
+                    (
+                        h.get("productivity_score") or 0,
+                        h.get("task_hours") or 0,
+                        h.get("tasks_completed") or 0,
+                        h.get("idle_hours") or 0,
+                        h.get("social_media_usage") or 0,
+                        h.get("break_frequency") or 0
+                    )
+                    for h in batch
+                ],
+                dtype=np.float64
+            )
+            scores = block[:, 0]
+            score_chunks.append(scores)
+            metric_sums += block[:, 1:].sum(axis=0)
+            highest = max(highest, float(scores.max()))
+            lowest = min(lowest, float(scores.min()))
+
+            for h in batch:
+                category = h.get("category_rule_based")
+                if category in category_counts:
+                    category_counts[category] += 1
+
+        if not score_chunks:
             return {
                 "total_analyses": 0,
                 "average_score": 0,
                 "highest_score": 0,
                 "lowest_score": 0,
-                "category_distribution": {
-                    "Highly Productive": 0,
-                    "Moderately Productive": 0,
-                    "Fake Productivity": 0
-                },
+                "category_distribution": category_counts,
                 "trend": 0,
                 "recent_analyses": [],
                 "avg_task_hours": 0,
@@ -285,51 +1032,48 @@ class ProductivityAnalysisDB:
                 "avg_break_frequency": 0
             }
 
-        scores = [h.get("productivity_score", h.get("score", 0)) for h in history]
-        categories = [h.get("category_rule_based", h.get("category", "Unknown")) for h in history]
-        task_hours = [h.get("task_hours", 0) for h in history]
-        tasks_completed = [h.get("tasks_completed", 0) for h in history]
-        idle_hours = [h.get("idle_hours", 0) for h in history]
-        social_media_hours = [h.get("social_media_usage", h.get("social_media_hours", 0)) for h in history]
-        break_frequency = [h.get("break_frequency", 0) for h in history]
-
-        # Calculate trend (comparing recent vs older)
-        if len(scores) >= 2:
-            mid = len(scores) // 2
-            recent_avg = sum(scores[:mid]) / mid if mid > 0 else 0
-            older_avg = sum(scores[mid:]) / (len(scores) - mid) if (len(scores) - mid) > 0 else 0
-            trend = recent_avg - older_avg
+        # Trend compares the newer half (records come newest first) with the older half
+        scores = np.concatenate(score_chunks)
+        total = len(scores)
+        mid = total // 2
+        if total >= 2:
+            trend = float(scores[:mid].mean() - scores[mid:].mean())
         else:
             trend = 0
 
-        def safe_avg(lst):
-            return round(sum(lst) / len(lst), 2) if lst and any(x is not None for x in lst) else 0
+        task_sum, tasks_completed_sum, idle_sum, social_sum, break_sum = metric_sums.tolist()
+
+        # Full rows, as the RPC returns them; the pages above skip suggestions
+        recent_analyses = await self.get_user_history(user_id, limit=10)
 
         return {
-            "total_analyses": len(history),
-            "average_score": round(sum(scores) / len(scores), 2) if scores else 0,
-            "highest_score": round(max(scores), 2) if scores else 0,
-            "lowest_score": round(min(scores), 2) if scores else 0,
-            "category_distribution": {
-                "Highly Productive": categories.count("Highly Productive"),
-                "Moderately Productive": categories.count("Moderately Productive"),
-                "Fake Productivity": categories.count("Fake Productivity")
-            },
+            "total_analyses": total,
+            "average_score": round(float(scores.sum()) / total, 2),
+            "highest_score": round(highest, 2),
+            "lowest_score": round(lowest, 2),
+            "category_distribution": category_counts,
             "trend": round(trend, 2),
-            "recent_analyses": history[:10],
-            "avg_task_hours": safe_avg(task_hours),
-            "avg_tasks_completed": safe_avg(tasks_completed),
-            "avg_idle_hours": safe_avg(idle_hours),
-            "avg_social_media_hours": safe_avg(social_media_hours),
-            "avg_break_frequency": safe_avg(break_frequency)
+            "recent_analyses": recent_analyses,
+            "avg_task_hours": round(task_sum / total, 2),
+            "avg_tasks_completed": round(tasks_completed_sum / total, 2),
+            "avg_idle_hours": round(idle_sum / total, 2),
+            "avg_social_media_hours": round(social_sum / total, 2),
+            "avg_break_frequency": round(break_sum / total, 2)
         }
 
 
+# Singleton instance
+_db_instance: Optional[ProductivityAnalysisDB] = None
+
+
 def get_db() -> ProductivityAnalysisDB:
     """
     Dependency injection for database instance.
     
     Returns:
-        ProductivityAnalysisDB: Database instance
+        ProductivityAnalysisDB: Shared database instance
     """
-    return ProductivityAnalysisDB()
+    global _db_instance
+    if _db_instance is None:
+        _db_instance = ProductivityAnalysisDB()
+    return _db_instance
@@ -151,6 +151,8 @@ class ScoreBreakdown(BaseModel):
     Breakdown of productivity score components.
     """
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     productive: float = Field(..., description="Hours of productive work")
     idle: float = Field(..., description="Hours of idle time")
     social: float = Field(..., description="Hours of social media usage")
@@ -162,7 +164,8 @@ class AnalysisResult(BaseModel):
     Schema for productivity analysis result.
     """
     
-    model_config = ConfigDict(from_attributes=True)
+    # Output models are built once per response and never mutated
+    model_config = ConfigDict(from_attributes=True, extra='forbid', frozen=True)
     
     id: Optional[str] = Field(None, description="Analysis record ID")
     user_id: str = Field(..., description="User identifier")
@@ -200,6 +203,8 @@ class BatchSummary(BaseModel):
     Summary statistics for batch analysis.
     """
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     average_score: float = Field(..., ge=0, le=100)
     highest_score: float = Field(..., ge=0, le=100)
     lowest_score: float = Field(..., ge=0, le=100)
@@ -221,6 +226,8 @@ class AnalyticsSummary(BaseModel):
     Schema for analytics summary response.
     """
     
+    model_config = ConfigDict(extra='forbid', frozen=True)
+    
     total_analyses: int
     average_score: float
     highest_score: float
@@ -9,6 +9,7 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi.responses import ORJSONResponse
 
 from ..models.schemas import (
     AnalysisRequest,
@@ -25,7 +26,11 @@ from ..services.suggestions import SuggestionEngine, get_suggestion_engine
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/analyze", tags=["Analysis"])
+router = APIRouter(
+    prefix="/analyze",
+    tags=["Analysis"],
+    default_response_class=ORJSONResponse
+)
 
 
 async def verify_auth(authorization: Optional[str] = Header(None)) -> str:
@@ -58,6 +63,33 @@ async def verify_auth(authorization: Optional[str] = Header(None)) -> str:
     return "anonymous"
 
 
+async def _predict_ml_category(classifier: MLClassifier, activity) -> Optional[str]:
+    """
+    Predict the ML category for activity data, if a model is available.
+    
+    Args:
+        classifier: ML classifier
+        activity: Activity data with the five feature fields
+        
+    Returns:
+        Predicted category, or None if no model is trained or prediction fails
+    """
+    if not classifier.is_trained:
+        return None
+    try:
+        ml_result = await classifier.predict_single_async(
+            task_hours=activity.task_hours,
+            idle_hours=activity.idle_hours,
+            social_media_usage=activity.social_media_usage,
+            break_frequency=activity.break_frequency,
+            tasks_completed=activity.tasks_completed
+        )
+        return ml_result['predicted_category']
+    except Exception as e:
+        logger.warning(f"ML prediction failed: {e}")
+        return None
+
+
 @router.post(
     "",
     response_model=AnalysisResult,
@@ -71,7 +103,7 @@ async def analyze_productivity(
     classifier: MLClassifier = Depends(get_classifier),
     suggestion_engine: SuggestionEngine = Depends(get_suggestion_engine),
     user_id: str = Depends(verify_auth)
-) -> AnalysisResult:
+) -> ORJSONResponse:
     """
     Analyze single productivity data entry.
     
@@ -95,7 +127,7 @@ async def analyze_productivity(
     try:
         activity = request.activity_data
         
-        # Calculate rule-based score
+        # Calculate rule-based score; it is cheap, so it runs inline
         scoring_result = scorer.calculate_score(
             task_hours=activity.task_hours,
             idle_hours=activity.idle_hours,
@@ -104,20 +136,8 @@ async def analyze_productivity(
             tasks_completed=activity.tasks_completed
         )
         
-        # Get ML prediction if model is trained
-        ml_category = None
-        if classifier.is_trained:
-            try:
-                ml_result = classifier.predict_single(
-                    task_hours=activity.task_hours,
-                    idle_hours=activity.idle_hours,
-                    social_media_usage=activity.social_media_usage,
-                    break_frequency=activity.break_frequency,
-                    tasks_completed=activity.tasks_completed
-                )
-                ml_category = ml_result['predicted_category']
-            except Exception as e:
-                logger.warning(f"ML prediction failed: {e}")
+        # ML prediction runs off the event loop
+        ml_category = await _predict_ml_category(classifier, activity)
         
         # Generate suggestions
         suggestions = suggestion_engine.generate_suggestions(
@@ -144,7 +164,8 @@ async def analyze_productivity(
             productivity_score=scoring_result.score,
             category_rule_based=scoring_result.category,
             category_ml=ml_category,
-            suggestions=suggestions
+            suggestions=suggestions,
+            created_at=timestamp
         )
         
         logger.info(
@@ -152,14 +173,14 @@ async def analyze_productivity(
             f"score={scoring_result.score}, category={scoring_result.category}"
         )
         
-        return AnalysisResult(
+        result = AnalysisResult.model_construct(
             id=record.get('id'),
             user_id=request.user_id,
             user_name=request.user_name,
             productivity_score=scoring_result.score,
             category_rule_based=scoring_result.category,
             category_ml=ml_category,
-            breakdown=ScoreBreakdown(
+            breakdown=ScoreBreakdown.model_construct(
                 productive=scoring_result.breakdown['productive'],
                 idle=scoring_result.breakdown['idle'],
                 social=scoring_result.breakdown['social'],
@@ -174,6 +195,10 @@ async def analyze_productivity(
             tasks_completed=activity.tasks_completed
         )
         
+        # Inputs were validated on the way in and the scorer output is bounded,
+        # so the result is built without re-validation and encoded by orjson
+        return ORJSONResponse(result.model_dump())
+        
     except Exception as e:
         logger.error(f"Analysis error: {e}")
         raise HTTPException(
@@ -193,7 +218,7 @@ async def quick_analyze(
     scorer: ProductivityScorer = Depends(get_scorer),
     classifier: MLClassifier = Depends(get_classifier),
     suggestion_engine: SuggestionEngine = Depends(get_suggestion_engine)
-) -> AnalysisResult:
+) -> ORJSONResponse:
     """
     Quick productivity analysis without database storage.
     
@@ -209,7 +234,7 @@ async def quick_analyze(
         AnalysisResult (not stored in database)
     """
     try:
-        # Calculate score
+        # Calculate rule-based score inline
         scoring_result = scorer.calculate_score(
             task_hours=activity.task_hours,
             idle_hours=activity.idle_hours,
@@ -218,20 +243,7 @@ async def quick_analyze(
             tasks_completed=activity.tasks_completed
         )
         
-        # ML prediction
-        ml_category = None
-        if classifier.is_trained:
-            try:
-                ml_result = classifier.predict_single(
-                    task_hours=activity.task_hours,
-                    idle_hours=activity.idle_hours,
-                    social_media_usage=activity.social_media_usage,
-                    break_frequency=activity.break_frequency,
-                    tasks_completed=activity.tasks_completed
-                )
-                ml_category = ml_result['predicted_category']
-            except Exception:
-                pass
+        ml_category = await _predict_ml_category(classifier, activity)
         
         # Generate suggestions
         suggestions = suggestion_engine.generate_suggestions(
@@ -243,14 +255,14 @@ async def quick_analyze(
             score=scoring_result.score
         )
         
-        return AnalysisResult(
+        result = AnalysisResult.model_construct(
             id=None,
             user_id="anonymous",
             user_name="Anonymous User",
             productivity_score=scoring_result.score,
             category_rule_based=scoring_result.category,
             category_ml=ml_category,
-            breakdown=ScoreBreakdown(
+            breakdown=ScoreBreakdown.model_construct(
                 productive=scoring_result.breakdown['productive'],
                 idle=scoring_result.breakdown['idle'],
                 social=scoring_result.breakdown['social'],
@@ -265,6 +277,10 @@ async def quick_analyze(
             tasks_completed=activity.tasks_completed
         )
         
+        # Inputs were validated on the way in and the scorer output is bounded,
+        # so the result is built without re-validation and encoded by orjson
+        return ORJSONResponse(result.model_dump())
+        
     except Exception as e:
         logger.error(f"Quick analysis error: {e}")
         raise HTTPException(
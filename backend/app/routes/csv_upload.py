@@ -4,13 +4,15 @@ CSV Upload API routes.
 This module provides endpoints for batch CSV processing.
 """
 
+import asyncio
 import logging
+from collections import Counter
 from datetime import datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import StreamingResponse
-import io
+from fastapi.responses import ORJSONResponse, Response
+import pandas as pd
 
 from ..models.schemas import (
     BatchAnalysisResult,
@@ -29,6 +31,30 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/upload-csv", tags=["CSV Upload"])
 
+# The template never changes, so encode it once at import
+_TEMPLATE_BYTES = CSVParser().generate_template().encode('utf-8')
+
+
+def _predict_ml_categories(classifier: MLClassifier, df: pd.DataFrame) -> List[Optional[str]]:
+    """
+    Predict ML categories for every parsed row, if a model is available.
+    
+    Args:
+        classifier: ML classifier
+        df: Parsed CSV data with the five feature columns
+        
+    Returns:
+        Predicted category per row, or None per row if no model is trained
+        or prediction fails
+    """
+    if not classifier.is_trained:
+        return [None] * len(df)
+    try:
+        return classifier.predict_batch(df).tolist()
+    except Exception as e:
+        logger.warning(f"Batch ML prediction failed: {e}")
+        return [None] * len(df)
+
 
 @router.post(
     "",
@@ -45,7 +71,7 @@ async def upload_csv(
     classifier: MLClassifier = Depends(get_classifier),
     suggestion_engine: SuggestionEngine = Depends(get_suggestion_engine),
     csv_parser: CSVParser = Depends(get_csv_parser)
-) -> BatchAnalysisResult:
+) -> ORJSONResponse:
     """
     Process CSV file for batch productivity analysis.
     
@@ -70,23 +96,22 @@ async def upload_csv(
     Returns:
         BatchAnalysisResult with all processed rows and summary
     """
-    # Validate file type
-    if not file.filename.endswith('.csv'):
+    # Validate file content
+    if not csv_parser.looks_like_csv(file.file):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only CSV files are accepted"
         )
     
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Parse CSV
-        df, errors = csv_parser.parse_csv_bytes(content)
+        # Parse CSV straight from the spooled upload, off the event loop
+        df, errors = await asyncio.to_thread(
+            csv_parser.parse_csv_file, file.file, known_columns_only=True
+        )
         
         if errors:
             logger.warning(f"CSV parsing errors: {errors}")
-            return BatchAnalysisResult(
+            return ORJSONResponse(BatchAnalysisResult(
                 total_rows=0,
                 successful=0,
                 failed=0,
@@ -98,113 +123,95 @@ async def upload_csv(
                     category_distribution={}
                 ),
                 errors=errors
-            )
+            ).model_dump())
         
-        # Process each row
-        results: List[AnalysisResult] = []
-        row_errors: List[str] = []
-        scores: List[float] = []
-        categories: List[str] = []
+        # Score every row in one vectorized pass
+        batch_scores, batch_categories, batch_breakdown = await asyncio.to_thread(
+            scorer.calculate_score_batch, df
+        )
         
-        rows = csv_parser.get_all_rows(df)
+        # ML prediction, suggestions and row extraction for all rows at
+        # once, in parallel and off the event loop
+        ml_categories, batch_suggestions, rows = await asyncio.gather(
+            asyncio.to_thread(_predict_ml_categories, classifier, df),
+            asyncio.to_thread(
+                suggestion_engine.generate_suggestions_batch,
+                task_hours=df['task_hours'].to_numpy(),
+                idle_hours=df['idle_hours'].to_numpy(),
+                social_media_usage=df['social_media_usage'].to_numpy(),
+                break_frequency=df['break_frequency'].to_numpy(),
+                tasks_completed=df['tasks_completed'].to_numpy(),
+                scores=batch_scores,
+                max_suggestions=3
+            ),
+            asyncio.to_thread(csv_parser.get_all_rows_tuples, df)
+        )
         
-        for i, row_data in enumerate(rows, start=1):
-            try:
-                # Only allow expected keys for ML and suggestions
-                allowed_keys = [
-                    'task_hours', 'idle_hours', 'social_media_usage', 'break_frequency', 'tasks_completed'
-                ]
-                filtered_row_data = {k: row_data[k] for k in allowed_keys if k in row_data}
-
-                # Calculate score
-                scoring_result = scorer.calculate_score(
-                    task_hours=filtered_row_data['task_hours'],
-                    idle_hours=filtered_row_data['idle_hours'],
-                    social_media_hours=filtered_row_data['social_media_usage'],
-                    break_frequency=filtered_row_data['break_frequency'],
-                    tasks_completed=filtered_row_data['tasks_completed']
-                )
-
-                # ML prediction
-                ml_category = None
-                if classifier.is_trained:
-                    try:
-                        ml_result = classifier.predict_single(**filtered_row_data)
-                        ml_category = ml_result['predicted_category']
-                    except Exception:
-                        pass
-
-                # Prepare only allowed arguments for suggestions
-                suggestion_args = {
-                    'task_hours': filtered_row_data.get('task_hours', 0),
-                    'idle_hours': filtered_row_data.get('idle_hours', 0),
-                    'social_media_usage': filtered_row_data.get('social_media_usage', 0),
-                    'break_frequency': filtered_row_data.get('break_frequency', 0),
-                    'tasks_completed': filtered_row_data.get('tasks_completed', 0),
-                    'score': scoring_result.score,
-                    'max_suggestions': 3
-                }
-                suggestions = suggestion_engine.generate_suggestions(**suggestion_args)
-                
-                timestamp = datetime.utcnow().isoformat()
-                
-                # Save to database
-                record = await db.create_analysis(
-                    user_id=user_id,
-                    user_name=user_name,
-                    task_hours=row_data['task_hours'],
-                    idle_hours=row_data['idle_hours'],
-                    social_media_usage=row_data['social_media_usage'],
-                    break_frequency=row_data['break_frequency'],
-                    tasks_completed=row_data['tasks_completed'],
-                    productivity_score=scoring_result.score,
-                    category_rule_based=scoring_result.category,
-                    category_ml=ml_category,
-                    suggestions=suggestions
-                )
-                
-                # Create result
-                result = AnalysisResult(
-                    id=record.get('id'),
-                    user_id=user_id,
-                    user_name=user_name,
-                    productivity_score=scoring_result.score,
-                    category_rule_based=scoring_result.category,
-                    category_ml=ml_category,
-                    breakdown=ScoreBreakdown(
-                        productive=scoring_result.breakdown['productive'],
-                        idle=scoring_result.breakdown['idle'],
-                        social=scoring_result.breakdown['social'],
-                        breaks=scoring_result.breakdown['breaks']
-                    ),
-                    suggestions=suggestions,
-                    created_at=timestamp,
-                    task_hours=row_data['task_hours'],
-                    idle_hours=row_data['idle_hours'],
-                    social_media_usage=row_data['social_media_usage'],
-                    break_frequency=row_data['break_frequency'],
-                    tasks_completed=row_data['tasks_completed']
-                )
-                
-                results.append(result)
-                scores.append(scoring_result.score)
-                categories.append(scoring_result.category)
-                
-            except Exception as e:
-                error_msg = f"Row {i}: {str(e)}"
-                row_errors.append(error_msg)
-                logger.warning(f"Error processing row {i}: {e}")
+        # Process each row into preallocated lists
+        n_rows = len(rows)
+        records: List[Optional[dict]] = [None] * n_rows
+        breakdowns: List[Optional[ScoreBreakdown]] = [None] * n_rows
+        
+        # Every row of one upload shares the upload's timestamp
+        timestamp = datetime.utcnow().isoformat()
+        
+        for i, (row, score, category, ml_category, suggestions, productive, idle, social, breaks) in enumerate(
+            zip(
+                rows,
+                batch_scores.tolist(),
+                batch_categories.tolist(),
+                ml_categories,
+                batch_suggestions,
+                batch_breakdown['productive'].tolist(),
+                batch_breakdown['idle'].tolist(),
+                batch_breakdown['social'].tolist(),
+                batch_breakdown['breaks'].tolist()
+            )
+        ):
+            task_hours, idle_hours, social_media_usage, break_frequency, tasks_completed = row
+            records[i] = {
+                "user_id": user_id,
+                "user_name": user_name,
+                "task_hours": task_hours,
+                "idle_hours": idle_hours,
+                "social_media_usage": social_media_usage,
+                "break_frequency": break_frequency,
+                "tasks_completed": tasks_completed,
+                "productivity_score": score,
+                "category_rule_based": category,
+                "category_ml": ml_category,
+                "suggestions": suggestions,
+                "created_at": timestamp
+            }
+            breakdowns[i] = ScoreBreakdown.model_construct(
+                productive=productive,
+                idle=idle,
+                social=social,
+                breaks=breaks
+            )
+        
+        # Save all rows to database in one insert
+        stored_records = await db.create_analyses_bulk(records)
+        
+        results: List[Optional[AnalysisResult]] = [None] * n_rows
+        for i, (record, stored, breakdown) in enumerate(zip(records, stored_records, breakdowns)):
+            results[i] = AnalysisResult.model_construct(
+                id=stored.get('id'),
+                breakdown=breakdown,
+                **record
+            )
         
-        # Calculate summary
-        if scores:
+        # Calculate summary straight from the batch arrays
+        if n_rows:
+            category_counts = Counter(batch_categories.tolist())
             summary = BatchSummary(
-                average_score=round(sum(scores) / len(scores), 2),
-                highest_score=round(max(scores), 2),
-                lowest_score=round(min(scores), 2),
+                average_score=round(float(batch_scores.mean()), 2),
+                highest_score=round(float(batch_scores.max()), 2),
+                lowest_score=round(float(batch_scores.min()), 2),
                 category_distribution={
-                    "Highly Productive": categories.count("Highly Productive"),
-                    "Moderately Productive": categories.count("Moderately Productive"),
-                    "Fake Productivity": categories.count("Fake Productivity")
+                    "Highly Productive": category_counts["Highly Productive"],
+                    "Moderately Productive": category_counts["Moderately Productive"],
+                    "Fake Productivity": category_counts["Fake Productivity"]
                 }
             )
         else:
@@ -218,14 +225,18 @@ async def upload_csv(
                     "Fake Productivity": 0
                 }
             )
-        return BatchAnalysisResult(
-            total_rows=len(rows),
-            successful=len(results),
-            failed=len(row_errors),
+        # Rows come from the cleaned, range-clipped CSV and the batch scorer, so
+        # results are built without per-row validation and encoded by orjson.
+        # No row can fail individually: every row is stored or the whole
+        # upload fails, so failed/errors are only set for rejected files
+        return ORJSONResponse(BatchAnalysisResult.model_construct(
+            total_rows=n_rows,
+            successful=n_rows,
+            failed=0,
             results=results,
             summary=summary,
-            errors=row_errors
-        )
+            errors=[]
+        ).model_dump())
         
     except Exception as e:
         logger.error(f"CSV upload error: {e}")
@@ -240,19 +251,15 @@ async def upload_csv(
     summary="Download CSV template",
     description="Download a sample CSV template for productivity data."
 )
-async def download_template(
-    csv_parser: CSVParser = Depends(get_csv_parser)
-) -> StreamingResponse:
+async def download_template() -> Response:
     """
     Download CSV template file.
     
     Returns:
-        Streaming response with CSV template
+        Response with CSV template
     """
-    template = csv_parser.generate_template()
-    
-    return StreamingResponse(
-        io.BytesIO(template.encode('utf-8')),
+    return Response(
+        content=_TEMPLATE_BYTES,
         media_type="text/csv",
         headers={
             "Content-Disposition": "attachment; filename=productivity_template.csv"
@@ -279,15 +286,14 @@ async def validate_csv(
     Returns:
         Validation result with column info and statistics
     """
-    if not file.filename.endswith('.csv'):
+    if not csv_parser.looks_like_csv(file.file):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only CSV files are accepted"
         )
     
     try:
-        content = await file.read()
-        df, errors = csv_parser.parse_csv_bytes(content)
+        df, errors = await asyncio.to_thread(csv_parser.parse_csv_file, file.file)
         
         if errors:
             return {
@@ -298,7 +304,7 @@ async def validate_csv(
                 "statistics": {}
             }
         
-        stats = csv_parser.get_summary_stats(df)
+        stats = await asyncio.to_thread(csv_parser.get_summary_stats, df)
         
         return {
             "valid": True,
@@ -339,42 +345,39 @@ async def preview_csv(
     Returns:
         Preview results for first 5 rows
     """
-    if not file.filename.endswith('.csv'):
+    if not csv_parser.looks_like_csv(file.file):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only CSV files are accepted"
         )
     
     try:
-        content = await file.read()
-        df, errors = csv_parser.parse_csv_bytes(content)
+        # Only the previewed rows are parsed; the rest are just counted
+        df, errors = await asyncio.to_thread(
+            csv_parser.parse_csv_file, file.file, nrows=5, known_columns_only=True
+        )
         
         if errors:
             return {"valid": False, "errors": errors, "preview": []}
         
-        # Get first 5 rows
-        rows = csv_parser.get_all_rows(df)[:5]
-        preview_results = []
-        
-        for i, row_data in enumerate(rows, start=1):
-            scoring_result = scorer.calculate_score(
-                task_hours=row_data['task_hours'],
-                idle_hours=row_data['idle_hours'],
-                social_media_hours=row_data['social_media_usage'],
-                break_frequency=row_data['break_frequency'],
-                tasks_completed=row_data['tasks_completed']
-            )
-            
-            preview_results.append({
+        # Score the previewed rows in one vectorized pass
+        scores, categories, _ = scorer.calculate_score_batch(df)
+        preview_results = [
+            {
                 "row": i,
                 "input": row_data,
-                "score": scoring_result.score,
-                "category": scoring_result.category
-            })
+                "score": score,
+                "category": category
+            }
+            for i, (row_data, score, category) in enumerate(
+                zip(csv_parser.get_all_rows(df), scores.tolist(), categories.tolist()),
+                start=1
+            )
+        ]
         
         return {
             "valid": True,
-            "total_rows": len(csv_parser.get_all_rows(df)),
+            "total_rows": await asyncio.to_thread(csv_parser.count_rows, file.file),
             "preview": preview_results
         }
         
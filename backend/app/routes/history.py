@@ -7,6 +7,7 @@ This module provides endpoints for user productivity history management.
 import logging
 from typing import Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from ..models.schemas import HistoryResponse, SuccessResponse, ErrorResponse
@@ -160,48 +161,23 @@ async def get_history_stats(
         Dict with statistics
     """
     try:
-        history = await db.get_user_history(user_id=user_id, limit=1000)
+        stats = await db.get_user_stats(user_id, sample_limit=1000)
         
-        if not history:
+        if not stats:
             return {
                 "user_id": user_id,
                 "total_records": 0,
                 "statistics": None
             }
         
-        # Extract scores
-        scores = []
-        for record in history:
-            score = record.get('productivity_score') or record.get('score', 0)
-            scores.append(score)
-        
-        # Calculate statistics
-        import statistics as st
-        
-        stats = {
-            "count": len(scores),
-            "mean": round(st.mean(scores), 2) if scores else 0,
-            "median": round(st.median(scores), 2) if scores else 0,
-            "stdev": round(st.stdev(scores), 2) if len(scores) > 1 else 0,
-            "min": round(min(scores), 2) if scores else 0,
-            "max": round(max(scores), 2) if scores else 0
-        }
-        
-        # Category breakdown
-        categories = [
-            record.get('category_rule_based') or record.get('category', 'Unknown')
-            for record in history
-        ]
-        
-        category_counts = {}
-        for cat in set(categories):
-            category_counts[cat] = categories.count(cat)
-        
         return {
             "user_id": user_id,
-            "total_records": len(history),
-            "statistics": stats,
-            "category_breakdown": category_counts
+            "total_records": stats["count"],
+            "statistics": {
+                key: stats[key]
+                for key in ("count", "mean", "median", "stdev", "min", "max")
+            },
+            "category_breakdown": stats["category_breakdown"]
         }
         
     except Exception as e:
@@ -233,10 +209,15 @@ async def get_productivity_trend(
     Returns:
         Dict with trend data points
     """
-    from datetime import datetime, timedelta
-    
     try:
-        history = await db.get_user_history(user_id=user_id, limit=100)
+        # Only the most recent points for the period are charted
+        points = {"day": 7, "week": 28}.get(period, 90)
+        
+        history = await db.get_user_history(
+            user_id=user_id,
+            limit=points,
+            columns="productivity_score,created_at"
+        )
         
         if not history:
             return {
@@ -249,8 +230,8 @@ async def get_productivity_trend(
         # Extract date-score pairs
         trend_data = []
         for record in history:
-            timestamp = record.get('created_at') or record.get('timestamp', '')
-            score = record.get('productivity_score') or record.get('score', 0)
+            timestamp = record.get('created_at')
+            score = record.get('productivity_score') or 0
             
             if timestamp:
                 trend_data.append({
@@ -261,21 +242,17 @@ async def get_productivity_trend(
         # Reverse to chronological order
         trend_data.reverse()
         
-        # Take last N based on period
-        if period == "day":
-            trend_data = trend_data[-7:]
-        elif period == "week":
-            trend_data = trend_data[-28:]
-        else:  # month
-            trend_data = trend_data[-90:]
-        
         # Calculate trend direction
         if len(trend_data) >= 2:
-            first_half = trend_data[:len(trend_data)//2]
-            second_half = trend_data[len(trend_data)//2:]
+            # Extract scores once; array slices are views, not copies
+            count = len(trend_data)
+            mid = count // 2
+            scores = np.fromiter(
+                (d['score'] for d in trend_data), dtype=np.float64, count=count
+            )
             
-            first_avg = sum(d['score'] for d in first_half) / len(first_half) if first_half else 0
-            second_avg = sum(d['score'] for d in second_half) / len(second_half) if second_half else 0
+            first_avg = scores[:mid].mean()
+            second_avg = scores[mid:].mean()
             
             if second_avg > first_avg + 5:
                 direction = "improving"
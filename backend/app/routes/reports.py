@@ -4,20 +4,102 @@ Reports API routes.
 This module provides endpoints for generating productivity reports and analytics.
 """
 
+import asyncio
+import csv
+import io
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
+import numpy as np
+import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 from ..models.schemas import ErrorResponse
 from ..models.database import ProductivityAnalysisDB, get_db
-from ..services.suggestions import SuggestionEngine
+from ..services.suggestions import SuggestionEngine, get_suggestion_engine
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/reports", tags=["Reports"])
+router = APIRouter(
+    prefix="/reports",
+    tags=["Reports"],
+    default_response_class=ORJSONResponse
+)
+
+# Records fetched and written per CSV export chunk
+_EXPORT_BATCH_SIZE = 500
+
+# CSV export headers and the columns they come from
+_EXPORT_COLUMNS = (
+    ("Date", "created_at::date"),
+    ("Productivity Score", "productivity_score"),
+    ("Category (Rule-based)", "category_rule_based"),
+    ("Category (ML)", "category_ml"),
+    ("Task Hours", "task_hours"),
+    ("Tasks Completed", "tasks_completed"),
+    ("Idle Hours", "idle_hours"),
+    ("Social Media Hours", "social_media_usage"),
+    ("Break Frequency", "break_frequency")
+)
+# PostgREST select that renders the export server-side, aliased to the headers
+_EXPORT_SELECT = ",".join(f'"{header}":{column}' for header, column in _EXPORT_COLUMNS)
+
+
+def _export_rows(batch: List[dict]) -> List[list]:
+    """
+    Format analysis records as CSV export rows, in _EXPORT_COLUMNS order.
+    
+    Args:
+        batch: Analysis records
+        
+    Returns:
+        One list of cell values per record; missing fields are left blank
+    """
+    return [
+        [
+            str(record.get('created_at') or '')[:10],
+            record.get('productivity_score', ''),
+            record.get('category_rule_based', ''),
+            record.get('category_ml', ''),
+            record.get('task_hours', ''),
+            record.get('tasks_completed', ''),
+            record.get('idle_hours', ''),
+            record.get('social_media_usage', ''),
+            record.get('break_frequency', '')
+        ]
+        for record in batch
+    ]
+
+
+def _record_days(history: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract record dates and scores as aligned arrays.
+    
+    Only the date part of each timestamp is used, as written, so the whole
+    column converts to datetime64[D] in one call; missing or malformed dates
+    become NaT instead of raising.
+    
+    Args:
+        history: Analysis records
+        
+    Returns:
+        Tuple of (dates, scores); records without a usable timestamp are dropped
+    """
+    stamps = np.array(
+        [str(r.get('created_at') or '')[:10] for r in history],
+        dtype=str
+    )
+    dates = pd.to_datetime(stamps, format='%Y-%m-%d', errors='coerce').values.astype('datetime64[D]')
+    
+    scores = np.fromiter(
+        (r.get('productivity_score') or 0 for r in history),
+        dtype=np.float64,
+        count=len(history)
+    )
+    valid = ~np.isnat(dates)
+    return dates[valid], scores[valid]
 
 
 @router.get(
@@ -28,7 +110,8 @@ router = APIRouter(prefix="/reports", tags=["Reports"])
 async def get_user_report(
     user_id: str,
     days: int = Query(default=30, ge=1, le=365, description="Days to analyze"),
-    db: ProductivityAnalysisDB = Depends(get_db)
+    db: ProductivityAnalysisDB = Depends(get_db),
+    suggestion_engine: SuggestionEngine = Depends(get_suggestion_engine)
 ) -> dict:
     """
     Generate comprehensive user analytics report.
@@ -37,18 +120,25 @@ async def get_user_report(
         user_id: User identifier
         days: Number of days to include in report
         db: Database dependency
+        suggestion_engine: Suggestion engine dependency
         
     Returns:
         Dict with comprehensive analytics
     """
     try:
-        # Get analytics summary from database
-        analytics = await db.get_analytics_summary(user_id)
-        
-        # Get recent history for additional analysis
-        history = await db.get_user_history(user_id=user_id, limit=days)
+        cached = db.get_cached_report(user_id, "full", days)
+        if cached is not None:
+            return cached
+        
+        # Statistics, per-day averages and the summary are independent
+        # database aggregates; fetch them concurrently
+        stats, daily_averages, analytics = await asyncio.gather(
+            db.get_user_stats(user_id, sample_limit=days),
+            db.get_daily_averages(user_id, sample_limit=days),
+            db.get_analytics_summary(user_id)
+        )
         
-        if not history:
+        if not stats:
             return {
                 "user_id": user_id,
                 "period_days": days,
@@ -59,56 +149,19 @@ async def get_user_report(
                 }
             }
         
-        # Extract scores and categories
-        scores = []
-        categories = []
-        daily_metrics = {}
-        
-        for record in history:
-            score = record.get('productivity_score') or record.get('score', 0)
-            scores.append(score)
-            
-            category = record.get('category_rule_based') or record.get('category', 'Unknown')
-            categories.append(category)
-            
-            # Aggregate by date
-            timestamp = record.get('created_at') or record.get('timestamp', '')
-            if timestamp:
-                date_key = timestamp[:10] if isinstance(timestamp, str) else str(timestamp)[:10]
-                if date_key not in daily_metrics:
-                    daily_metrics[date_key] = {'scores': [], 'count': 0}
-                daily_metrics[date_key]['scores'].append(score)
-                daily_metrics[date_key]['count'] += 1
-        
-        # Calculate statistics
-        import statistics as st
-        
-        avg_score = round(st.mean(scores), 2) if scores else 0
-        median_score = round(st.median(scores), 2) if scores else 0
-        score_stdev = round(st.stdev(scores), 2) if len(scores) > 1 else 0
+        avg_score = stats['mean']
         
         # Category distribution
-        category_distribution = {}
-        for cat in set(categories):
-            count = categories.count(cat)
-            category_distribution[cat] = {
+        total = stats['count']
+        category_distribution = {
+            cat: {
                 "count": count,
-                "percentage": round((count / len(categories)) * 100, 1)
+                "percentage": round((count / total) * 100, 1)
             }
-        
-        # Daily averages for trend
-        daily_averages = []
-        for date_key in sorted(daily_metrics.keys()):
-            data = daily_metrics[date_key]
-            daily_averages.append({
-                "date": date_key,
-                "average_score": round(st.mean(data['scores']), 2),
-                "analyses_count": data['count']
-            })
+            for cat, count in stats['category_breakdown'].items()
+        }
         
         # Generate overall suggestions
-        suggestion_engine = SuggestionEngine()
-        
         # Use average metrics for suggestions
         avg_metrics = {
             'task_hours': analytics.get('avg_task_hours', 0),
@@ -131,11 +184,18 @@ async def get_user_report(
         
         # Determine trend
         if len(daily_averages) >= 2:
-            first_half = daily_averages[:len(daily_averages)//2]
-            second_half = daily_averages[len(daily_averages)//2:]
+            # Sum each half in place instead of slicing copies
+            count = len(daily_averages)
+            mid = count // 2
+            first_sum = second_sum = 0.0
+            for i, d in enumerate(daily_averages):
+                if i < mid:
+                    first_sum += d['average_score']
+                else:
+                    second_sum += d['average_score']
             
-            first_avg = st.mean([d['average_score'] for d in first_half]) if first_half else 0
-            second_avg = st.mean([d['average_score'] for d in second_half]) if second_half else 0
+            first_avg = first_sum / mid
+            second_avg = second_sum / (count - mid)
             
             trend_change = round(second_avg - first_avg, 2)
             
@@ -149,17 +209,17 @@ async def get_user_report(
             trend_change = 0
             trend_direction = "insufficient_data"
         
-        return {
+        report = {
             "user_id": user_id,
             "period_days": days,
             "generated_at": datetime.utcnow().isoformat(),
             "summary": {
-                "total_analyses": len(history),
+                "total_analyses": total,
                 "average_score": avg_score,
-                "median_score": median_score,
-                "score_std_deviation": score_stdev,
-                "min_score": round(min(scores), 2) if scores else 0,
-                "max_score": round(max(scores), 2) if scores else 0
+                "median_score": stats['median'],
+                "score_std_deviation": stats['stdev'],
+                "min_score": stats['min'],
+                "max_score": stats['max']
             },
             "category_distribution": category_distribution,
             "trend": {
@@ -170,6 +230,8 @@ async def get_user_report(
             "suggestions": suggestions,
             "analytics": analytics
         }
+        db.cache_report(user_id, "full", report, days)
+        return report
         
     except Exception as e:
         logger.error(f"Error generating report for {user_id}: {e}")
@@ -201,54 +263,48 @@ async def get_weekly_report(
         Dict with weekly report data
     """
     try:
+        cached = db.get_cached_report(user_id, "weekly", weeks_ago)
+        if cached is not None:
+            return cached
+        
         # Calculate date range
         today = datetime.utcnow().date()
         week_start = today - timedelta(days=today.weekday() + (weeks_ago * 7))
         week_end = week_start + timedelta(days=6)
         
-        history = await db.get_user_history(user_id=user_id, limit=500)
-        
-        # Filter to the specified week
-        week_data = []
-        for record in history:
-            timestamp = record.get('created_at') or record.get('timestamp', '')
-            if timestamp:
-                try:
-                    record_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).date()
-                    if week_start <= record_date <= week_end:
-                        week_data.append(record)
-                except:
-                    continue
-        
-        # Group by day of week
-        days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        daily_breakdown = {day: {'scores': [], 'count': 0} for day in days_of_week}
+        history = await db.get_user_history_range(
+            user_id,
+            week_start,
+            week_end,
+            columns="productivity_score,created_at"
+        )
         
-        for record in week_data:
-            timestamp = record.get('created_at') or record.get('timestamp', '')
-            score = record.get('productivity_score') or record.get('score', 0)
-            
-            try:
-                record_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                day_name = days_of_week[record_date.weekday()]
-                daily_breakdown[day_name]['scores'].append(score)
-                daily_breakdown[day_name]['count'] += 1
-            except:
-                continue
+        dates, scores = _record_days(history)
+        # Day 0 of the epoch (1970-01-01) was a Thursday; shift so Monday is 0
+        days = (dates.astype(np.int64) + 3) % 7
         
-        # Calculate daily averages
-        import statistics as st
+        # Group by day of week in one pass per statistic
+        days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        counts = np.bincount(days, minlength=7)
+        sums = np.bincount(days, weights=scores, minlength=7)
+        mins = np.full(7, np.inf)
+        maxs = np.full(7, -np.inf)
+        np.minimum.at(mins, days, scores)
+        np.maximum.at(maxs, days, scores)
+        # Days without analyses average to NaN so they never rank as best or worst
+        with np.errstate(invalid='ignore'):
+            means = sums / counts
         
+        # Calculate daily averages
         daily_summary = []
-        for day in days_of_week:
-            data = daily_breakdown[day]
-            if data['scores']:
+        for i, day in enumerate(days_of_week):
+            if counts[i]:
                 daily_summary.append({
                     "day": day,
-                    "average_score": round(st.mean(data['scores']), 2),
-                    "analyses_count": data['count'],
-                    "min_score": round(min(data['scores']), 2),
-                    "max_score": round(max(data['scores']), 2)
+                    "average_score": round(float(means[i]), 2),
+                    "analyses_count": int(counts[i]),
+                    "min_score": round(float(mins[i]), 2),
+                    "max_score": round(float(maxs[i]), 2)
                 })
             else:
                 daily_summary.append({
@@ -259,20 +315,21 @@ async def get_weekly_report(
                     "max_score": None
                 })
         
-        # Weekly totals
-        all_scores = [s for data in daily_breakdown.values() for s in data['scores']]
+        has_data = len(scores) > 0
         
-        return {
+        report = {
             "user_id": user_id,
             "week_start": str(week_start),
             "week_end": str(week_end),
             "weeks_ago": weeks_ago,
-            "total_analyses": len(week_data),
-            "weekly_average": round(st.mean(all_scores), 2) if all_scores else None,
+            "total_analyses": len(scores),
+            "weekly_average": round(float(scores.mean()), 2) if has_data else None,
             "daily_breakdown": daily_summary,
-            "best_day": max(daily_summary, key=lambda x: x['average_score'] or 0)['day'] if all_scores else None,
-            "worst_day": min(daily_summary, key=lambda x: x['average_score'] or float('inf'))['day'] if all_scores else None
+            "best_day": days_of_week[int(np.nanargmax(means))] if has_data else None,
+            "worst_day": days_of_week[int(np.nanargmin(means))] if has_data else None
         }
+        db.cache_report(user_id, "weekly", report, weeks_ago)
+        return report
         
     except Exception as e:
         logger.error(f"Error generating weekly report for {user_id}: {e}")
@@ -305,40 +362,40 @@ async def compare_periods(
     Returns:
         Dict with comparison data
     """
-    import statistics as st
-    
     try:
-        history = await db.get_user_history(user_id=user_id, limit=1000)
+        cached = db.get_cached_report(user_id, "comparison", period1_days, period2_days)
+        if cached is not None:
+            return cached
         
         today = datetime.utcnow().date()
         
         # Period 1: Last N days
         period1_start = today - timedelta(days=period1_days)
-        period1_scores = []
         
         # Period 2: Previous N days before period 1
         period2_start = today - timedelta(days=period2_days)
         period2_end = period1_start - timedelta(days=1)
-        period2_scores = []
         
-        for record in history:
-            timestamp = record.get('created_at') or record.get('timestamp', '')
-            score = record.get('productivity_score') or record.get('score', 0)
-            
-            if timestamp:
-                try:
-                    record_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).date()
-                    
-                    if record_date >= period1_start:
-                        period1_scores.append(score)
-                    elif period2_start <= record_date <= period2_end:
-                        period2_scores.append(score)
-                except:
-                    continue
+        history = await db.get_user_history_range(
+            user_id,
+            min(period1_start, period2_start),
+            today,
+            columns="productivity_score,created_at"
+        )
+        
+        dates, scores = _record_days(history)
+        period1_mask = dates >= np.datetime64(period1_start)
+        period2_mask = (
+            (dates >= np.datetime64(period2_start))
+            & (dates <= np.datetime64(period2_end))
+            & ~period1_mask
+        )
+        period1_scores = scores[period1_mask]
+        period2_scores = scores[period2_mask]
         
         # Calculate comparison metrics
-        period1_avg = round(st.mean(period1_scores), 2) if period1_scores else None
-        period2_avg = round(st.mean(period2_scores), 2) if period2_scores else None
+        period1_avg = round(float(period1_scores.mean()), 2) if len(period1_scores) else None
+        period2_avg = round(float(period2_scores.mean()), 2) if len(period2_scores) else None
         
         if period1_avg is not None and period2_avg is not None:
             change = round(period1_avg - period2_avg, 2)
@@ -355,7 +412,7 @@ async def compare_periods(
             change_percent = None
             status_text = "insufficient_data"
         
-        return {
+        report = {
             "user_id": user_id,
             "period1": {
                 "start": str(period1_start),
@@ -377,6 +434,8 @@ async def compare_periods(
                 "percent_change": change_percent
             }
         }
+        db.cache_report(user_id, "comparison", report, period1_days, period2_days)
+        return report
         
     except Exception as e:
         logger.error(f"Error comparing periods for {user_id}: {e}")
@@ -395,65 +454,62 @@ async def export_csv(
     user_id: str,
     days: int = Query(default=30, ge=1, le=365, description="Days to export"),
     db: ProductivityAnalysisDB = Depends(get_db)
-) -> StreamingResponse:
+) -> Response:
     """
     Export user data as CSV.
     
+    With Supabase the CSV is rendered by PostgREST and passed through;
+    otherwise rows are formatted here and streamed batch by batch.
+    
     Args:
         user_id: User identifier
         days: Days of data to export
         db: Database dependency
         
     Returns:
-        StreamingResponse with CSV data
+        Response with CSV data
     """
-    import io
-    import csv
-    
     try:
-        history = await db.get_user_history(user_id=user_id, limit=days)
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow([
-            'Date',
-            'Productivity Score',
-            'Category (Rule-based)',
-            'Category (ML)',
-            'Task Hours',
-            'Tasks Completed',
-            'Idle Hours',
-            'Social Media Hours',
-            'Break Frequency'
-        ])
-        
-        # Data rows
-        for record in history:
-            writer.writerow([
-                record.get('created_at', record.get('timestamp', ''))[:10],
-                record.get('productivity_score', record.get('score', '')),
-                record.get('category_rule_based', record.get('category', '')),
-                record.get('category_ml', ''),
-                record.get('task_hours', ''),
-                record.get('tasks_completed', ''),
-                record.get('idle_hours', ''),
-                record.get('social_media_usage', record.get('social_media_hours', '')),
-                record.get('break_frequency', '')
-            ])
-        
-        output.seek(0)
-        
         filename = f"productivity_report_{user_id}_{datetime.utcnow().strftime('%Y%m%d')}.csv"
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+        
+        csv_text = await db.get_user_history_csv(user_id, limit=days, columns=_EXPORT_SELECT)
+        if csv_text is not None:
+            return Response(csv_text.encode('utf-8'), media_type="text/csv", headers=headers)
+        
+        batches = db.iter_user_history(user_id, limit=days, batch_size=_EXPORT_BATCH_SIZE)
+        
+        # One reusable buffer; each batch of rows is encoded and flushed to
+        # the response before the next page is fetched
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        # Header and first page are built before the response starts, so a
+        # failure there is still reported as a 500
+        writer.writerow([header for header, _ in _EXPORT_COLUMNS])
+        writer.writerows(_export_rows(await anext(batches, [])))
+        
+        async def csv_chunks():
+            yield buffer.getvalue().encode('utf-8')
+            
+            try:
+                async for batch in batches:
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(_export_rows(batch))
+                    yield buffer.getvalue().encode('utf-8')
+            except Exception as e:
+                # The 200 status is already sent; abort the response so the
+                # client sees a failed download, not a truncated file
+                logger.error(f"Error streaming CSV export for {user_id}: {e}")
+                raise
         
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
+            csv_chunks(),
             media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
+            headers=headers
         )
         
     except Exception as e:
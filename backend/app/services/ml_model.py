@@ -5,15 +5,17 @@ This module provides ML classification capabilities for productivity
 category prediction using scikit-learn models.
 """
 
+import asyncio
 import logging
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import StratifiedKFold, train_test_split, cross_val_score
 from sklearn.metrics import (
     classification_report,
     accuracy_score,
@@ -21,6 +23,7 @@ from sklearn.metrics import (
     precision_recall_fscore_support
 )
 import joblib
+from joblib import Parallel, cpu_count, delayed
 
 from ..config import settings, ProductivityCategory
 from .preprocessing import DataPreprocessor, get_preprocessor
@@ -28,6 +31,54 @@ from .preprocessing import DataPreprocessor, get_preprocessor
 logger = logging.getLogger(__name__)
 
 
+def _fit_and_score(
+    model: Any,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    X: np.ndarray,
+    y: np.ndarray,
+    cv_folds: List[Tuple[np.ndarray, np.ndarray]],
+    target_names: List[str]
+) -> Dict[str, Any]:
+    """
+    Fit one candidate model and score it (runs in a worker process).
+    
+    Args:
+        model: Unfitted estimator
+        X_train, y_train: Training split
+        X_test, y_test: Held-out split
+        X, y: Full data for cross-validation
+        cv_folds: Precomputed (train_idx, test_idx) cross-validation splits
+        target_names: Category names for the classification report
+        
+    Returns:
+        Dict with the fitted estimator, accuracy, CV scores and report
+    """
+    model.fit(X_train, y_train)
+    
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    
+    # Cross-validation score
+    cv_scores = cross_val_score(model, X, y, cv=cv_folds)
+    
+    report = classification_report(
+        y_test, y_pred,
+        target_names=target_names,
+        output_dict=True
+    )
+    
+    return {
+        'model': model,
+        'accuracy': accuracy,
+        'cv_mean': cv_scores.mean(),
+        'cv_std': cv_scores.std(),
+        'classification_report': report
+    }
+
+
 class MLClassifier:
     """
     Machine Learning classifier for productivity categories.
@@ -43,7 +94,8 @@ class MLClassifier:
     SUPPORTED_MODELS = {
         'logistic_regression': LogisticRegression,
         'random_forest': RandomForestClassifier,
-        'decision_tree': DecisionTreeClassifier
+        'decision_tree': DecisionTreeClassifier,
+        'hist_gradient_boosting': HistGradientBoostingClassifier
     }
     
     CATEGORY_CLASSES = [
@@ -52,6 +104,22 @@ class MLClassifier:
         ProductivityCategory.HIGHLY_PRODUCTIVE
     ]
     
+    # Integer label codes used for training, indexed like CATEGORY_CLASSES
+    LABEL_CODES = {category: code for code, category in enumerate(CATEGORY_CLASSES)}
+    
+    # Single-point predictions remembered per classifier
+    PREDICTION_CACHE_SIZE = 4096
+    
+    # Concurrent single-point predictions arriving within this window are
+    # run through the model as one batch
+    PREDICT_BATCH_SIZE = 32
+    PREDICT_BATCH_WINDOW_SECONDS = 0.005
+    
+    # Model kept as a cheap guard in front of the selected model, and the
+    # top-class probability above which its answer is used as is
+    GUARD_MODEL_TYPE = 'logistic_regression'
+    GUARD_THRESHOLD = 0.95
+    
     def __init__(
         self,
         model_type: str = 'random_forest',
@@ -71,6 +139,10 @@ class MLClassifier:
         self.training_accuracy = 0.0
         self.preprocessor = get_preprocessor()
         
+        # Optional fast pre-classifier; rows it is confident about skip self.model
+        self.guard_model = None
+        self.guard_threshold = self.GUARD_THRESHOLD
+        
         # Model parameters
         self.model_params = {
             'logistic_regression': {
@@ -81,15 +153,29 @@ class MLClassifier:
             'random_forest': {
                 'n_estimators': 100,
                 'max_depth': 10,
+                'max_features': 'sqrt',
+                'max_samples': 0.5,
                 'random_state': 42,
                 'n_jobs': -1
             },
             'decision_tree': {
                 'max_depth': 10,
                 'random_state': 42
+            },
+            'hist_gradient_boosting': {
+                'max_iter': 100,
+                'max_depth': 6,
+                'learning_rate': 0.1,
+                'random_state': 42
             }
         }
         
+        # Single-point predictions are a pure function of the (rounded) inputs
+        # until the model changes; repeated requests skip the forest entirely
+        self._prediction_cache: Dict[Tuple[float, ...], Tuple[str, Tuple[float, ...]]] = {}
+        self._predict_queue: Optional[asyncio.Queue] = None
+        self._predict_worker: Optional[asyncio.Task] = None
+        
         # Try to load existing model
         self._try_load_model()
     
@@ -108,7 +194,9 @@ class MLClassifier:
                 self.model = saved_data['model']
                 self.model_type = saved_data.get('model_type', 'unknown')
                 self.training_accuracy = saved_data.get('accuracy', 0.0)
+                self.guard_model = saved_data.get('guard_model')
                 self.is_trained = True
+                self._prediction_cache.clear()
                 logger.info(
                     f"Loaded existing {self.model_type} model "
                     f"(accuracy: {self.training_accuracy:.2%})"
@@ -120,6 +208,20 @@ class MLClassifier:
             logger.warning(f"Could not load model from {self.model_path}: {e}")
         return False
     
+    @classmethod
+    def encode_labels(cls, labels) -> np.ndarray:
+        """
+        Convert category names to int8 label codes.
+        
+        Args:
+            labels: Iterable of category names
+            
+        Returns:
+            int8 array of codes matching CATEGORY_CLASSES order
+        """
+        codes = cls.LABEL_CODES
+        return np.fromiter((codes[label] for label in labels), dtype=np.int8, count=len(labels))
+    
     def _create_model(self, model_type: Optional[str] = None) -> Any:
         """
         Create a new model instance.
@@ -173,6 +275,7 @@ class MLClassifier:
         # Create and train model
         self.model = self._create_model()
         self.model.fit(X_train, y_train)
+        self.guard_model = None
         
         # Evaluate
         y_pred = self.model.predict(X_test)
@@ -180,6 +283,7 @@ class MLClassifier:
         
         self.training_accuracy = accuracy
         self.is_trained = True
+        self._prediction_cache.clear()
         
         # Generate detailed report
         report = classification_report(
@@ -218,7 +322,8 @@ class MLClassifier:
             test_size: Fraction of data for testing
             
         Returns:
-            Dict mapping model names to their results
+            Dict with per-model results (including the fitted estimator
+            under 'model'), the best model name and its accuracy
         """
         results = {}
         best_accuracy = 0.0
@@ -231,51 +336,108 @@ class MLClassifier:
             stratify=y
         )
         
-        for model_name in self.SUPPORTED_MODELS.keys():
-            logger.info(f"Training {model_name}...")
-            
-            model = self._create_model(model_name)
-            model.fit(X_train, y_train)
-            
-            y_pred = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred)
-            
-            # Cross-validation score
-            cv_scores = cross_val_score(model, X, y, cv=5)
-            
-            report = classification_report(
-                y_test, y_pred,
-                target_names=self.CATEGORY_CLASSES,
-                output_dict=True
+        # Same 5 stratified folds cross_val_score(cv=5) would build, computed
+        # once and shared by every candidate
+        cv_folds = list(StratifiedKFold(n_splits=5).split(X, y))
+        
+        # The candidates are independent; fit them in parallel worker
+        # processes (loky keeps its pool alive between calls), one per model.
+        # Each fits single-threaded so the pool does not oversubscribe the CPU
+        model_names = list(self.SUPPORTED_MODELS.keys())
+        logger.info(f"Training {', '.join(model_names)}...")
+        
+        candidates = [self._create_model(model_name) for model_name in model_names]
+        configured_jobs = []
+        for model in candidates:
+            configured_jobs.append(model.get_params().get('n_jobs'))
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=1)
+        
+        fitted = Parallel(n_jobs=min(len(candidates), cpu_count()))(
+            delayed(_fit_and_score)(
+                model,
+                X_train, y_train, X_test, y_test, X, y, cv_folds,
+                self.CATEGORY_CLASSES
             )
+            for model in candidates
+        )
+        
+        # Restore the configured n_jobs so predictions use every core again
+        for result, n_jobs in zip(fitted, configured_jobs):
+            if 'n_jobs' in result['model'].get_params():
+                result['model'].set_params(n_jobs=n_jobs)
+        
+        # Pick the winner in declaration order so ties resolve as before
+        for model_name, result in zip(model_names, fitted):
+            results[model_name] = result
+            accuracy = result['accuracy']
             
-            results[model_name] = {
-                'accuracy': accuracy,
-                'cv_mean': cv_scores.mean(),
-                'cv_std': cv_scores.std(),
-                'classification_report': report
-            }
-            
-            logger.info(f"{model_name}: Accuracy={accuracy:.2%}, CV={cv_scores.mean():.2%}")
+            logger.info(f"{model_name}: Accuracy={accuracy:.2%}, CV={result['cv_mean']:.2%}")
             
             if accuracy > best_accuracy:
                 best_accuracy = accuracy
                 best_model_type = model_name
-                self.model = model
+                self.model = result['model']
         
-        # Set best model
+        # Set best model, with the guard model in front of it if that does
+        # not cost held-out accuracy
         self.model_type = best_model_type
-        self.training_accuracy = best_accuracy
+        guard = results.get(self.GUARD_MODEL_TYPE)
+        self.training_accuracy = self.select_guard(
+            guard['model'] if guard else None, X_test, y_test
+        )
         self.is_trained = True
+        self._prediction_cache.clear()
         
-        logger.info(f"Best model: {best_model_type} (accuracy: {best_accuracy:.2%})")
+        logger.info(
+            f"Best model: {best_model_type} (accuracy: {self.training_accuracy:.2%}, "
+            f"guarded: {self.guard_model is not None})"
+        )
         
         return {
             'model_results': results,
             'best_model': best_model_type,
-            'best_accuracy': best_accuracy
+            'best_accuracy': self.training_accuracy,
+            'guarded': self.guard_model is not None
         }
     
+    def select_guard(
+        self,
+        guard: Any,
+        X_test: np.ndarray,
+        y_test: np.ndarray
+    ) -> float:
+        """
+        Put a guard model in front of self.model only if it does not lose accuracy.
+        
+        Both the bare model and the guarded predictor are scored on the
+        held-out data; the guard is kept when the guarded accuracy matches
+        or beats the bare one.
+        
+        Args:
+            guard: Fitted guard estimator, or None
+            X_test: Held-out features (scaled)
+            y_test: Held-out label codes
+            
+        Returns:
+            Held-out accuracy of the predictor as it will be served
+        """
+        self.guard_model = None
+        accuracy = accuracy_score(y_test, self.model.predict(X_test))
+        if guard is None or guard is self.model:
+            return accuracy
+        
+        self.guard_model = guard
+        guarded_pred = self.model.classes_.take(self._predict_proba(X_test).argmax(axis=1))
+        guarded_accuracy = accuracy_score(y_test, guarded_pred)
+        if guarded_accuracy < accuracy:
+            logger.info(
+                f"Guard dropped: {guarded_accuracy:.2%} guarded vs {accuracy:.2%} alone"
+            )
+            self.guard_model = None
+            return accuracy
+        return guarded_accuracy
+    
     def predict(
         self,
         X: np.ndarray
@@ -292,12 +454,17 @@ class MLClassifier:
         if not self.is_trained or self.model is None:
             raise ValueError("Model not trained. Call train() first or load a trained model.")
         
-        predictions = self.model.predict(X)
-        
         # Get probabilities if available
         if hasattr(self.model, 'predict_proba'):
-            probabilities = self.model.predict_proba(X)
+            probabilities = self._predict_proba(X)
+            # The supported classifiers predict the most probable class, so
+            # derive labels from the probabilities instead of a second pass
+            # over every tree
+            predictions = self._to_categories(
+                self.model.classes_.take(probabilities.argmax(axis=1))
+            )
         else:
+            predictions = self._to_categories(self.model.predict(X))
             # Create dummy probabilities for models without predict_proba
             probabilities = np.zeros((len(predictions), len(self.CATEGORY_CLASSES)))
             for i, pred in enumerate(predictions):
@@ -306,13 +473,89 @@ class MLClassifier:
         
         return predictions, probabilities
     
+    def _predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities, answered by the guard model where it is confident.
+        
+        Rows whose guard top-class probability exceeds guard_threshold keep
+        the guard's probabilities; only the rest are passed to self.model.
+        
+        Args:
+            X: Feature array (should be scaled)
+            
+        Returns:
+            Probability array, one row per input row
+        """
+        guard = self.guard_model
+        if guard is None or guard is self.model:
+            return self.model.predict_proba(X)
+        
+        probabilities = guard.predict_proba(X)
+        uncertain = probabilities.max(axis=1) <= self.guard_threshold
+        if uncertain.any():
+            probabilities[uncertain] = self.model.predict_proba(X[uncertain])
+        return probabilities
+    
+    def predict_batch(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Predict categories for every row of a DataFrame at once.
+        
+        Args:
+            df: DataFrame with the preprocessor's feature columns
+            
+        Returns:
+            Array of predicted category names, one per row
+        """
+        if not self.is_trained or self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a trained model.")
+        
+        X = self.preprocessor.prepare_batch_input(df)
+        if self.guard_model is not None and self.guard_model is not self.model:
+            # Same guarded labels as predict() and the single-row paths
+            return self.predict(X)[0]
+        return self._to_categories(self.model.predict(X))
+    
+    def _predict_label(self, X: np.ndarray) -> str:
+        """
+        Predict the category of a single prepared row, skipping probabilities.
+        
+        Args:
+            X: 1xN feature array (should be scaled)
+            
+        Returns:
+            Predicted category name
+        """
+        if not self.is_trained or self.model is None:
+            raise ValueError("Model not trained. Call train() first or load a trained model.")
+        
+        if self.guard_model is not None and self.guard_model is not self.model:
+            # Stay consistent with the guarded probabilities
+            return self.predict(X)[0][0]
+        return self._to_categories(self.model.predict(X))[0]
+    
+    def _to_categories(self, predictions: np.ndarray) -> np.ndarray:
+        """
+        Map raw model predictions to category names.
+        
+        Args:
+            predictions: Output of model.predict
+            
+        Returns:
+            Array of category names
+        """
+        # Models trained on label codes predict ints; map back to category names
+        if predictions.dtype.kind in 'iu':
+            return np.asarray(self.CATEGORY_CLASSES, dtype=object)[predictions]
+        return predictions
+    
     def predict_single(
         self,
         task_hours: float,
         idle_hours: float,
         social_media_usage: float,
         break_frequency: int,
-        tasks_completed: int
+        tasks_completed: int,
+        with_proba: bool = True
     ) -> Dict[str, Any]:
         """
         Make prediction for a single data point.
@@ -323,32 +566,217 @@ class MLClassifier:
             social_media_usage: Social media hours
             break_frequency: Number of breaks
             tasks_completed: Tasks completed
+            with_proba: Include confidence and class probabilities; when
+                False only the category is computed
             
         Returns:
             Dict with prediction results
         """
-        X = self.preprocessor.prepare_single_input(
+        key = self._feature_key(
             task_hours, idle_hours, social_media_usage,
             break_frequency, tasks_completed
         )
+        result = self._prediction_cache.get(key)
+        if not with_proba:
+            if result is not None:
+                prediction = result[0]
+            else:
+                prediction = self._predict_label(self.preprocessor.prepare_single_input(*key))
+            return {
+                'predicted_category': prediction,
+                'model_used': self.model_type
+            }
         
-        predictions, probabilities = self.predict(X)
+        if result is None:
+            X = self.preprocessor.prepare_single_input(*key)
+            predictions, probabilities = self.predict(X)
+            result = (predictions[0], tuple(probabilities[0].tolist()))
+            self._remember_prediction(key, result)
+        return self._format_prediction(result)
+    
+    async def predict_single_async(
+        self,
+        task_hours: float,
+        idle_hours: float,
+        social_media_usage: float,
+        break_frequency: int,
+        tasks_completed: int
+    ) -> Dict[str, Any]:
+        """
+        Make prediction for a single data point without blocking the event loop.
+        
+        Cached inputs are answered immediately; otherwise the point joins the
+        prediction batcher if it is running, or is predicted in a worker
+        thread.
+        
+        Args:
+            task_hours: Hours on tasks
+            idle_hours: Idle hours
+            social_media_usage: Social media hours
+            break_frequency: Number of breaks
+            tasks_completed: Tasks completed
+            
+        Returns:
+            Dict with prediction results
+        """
+        key = self._feature_key(
+            task_hours, idle_hours, social_media_usage,
+            break_frequency, tasks_completed
+        )
+        result = self._prediction_cache.get(key)
+        if result is not None:
+            return self._format_prediction(result)
+        
+        if self._predict_queue is None:
+            return await asyncio.to_thread(self.predict_single, *key)
         
-        prediction = predictions[0]
-        probs = probabilities[0]
+        future = asyncio.get_running_loop().create_future()
+        await self._predict_queue.put((key, future))
+        return self._format_prediction(await future)
+    
+    @staticmethod
+    def _feature_key(*features: float) -> Tuple[float, ...]:
+        """
+        Build the cache key for a feature tuple.
+        
+        Exact values are kept (only converted to float), so the key is
+        also the model input and a cached result is exactly what the model
+        would return for the request.
+        """
+        return tuple(float(value) for value in features)
+    
+    def _remember_prediction(
+        self,
+        key: Tuple[float, ...],
+        result: Tuple[str, Tuple[float, ...]]
+    ) -> None:
+        """Cache a prediction, evicting the oldest entry when the cache is full."""
+        cache = self._prediction_cache
+        if key not in cache and len(cache) >= self.PREDICTION_CACHE_SIZE:
+            cache.pop(next(iter(cache)), None)
+        cache[key] = result
+    
+    def _format_prediction(self, result: Tuple[str, Tuple[float, ...]]) -> Dict[str, Any]:
+        """
+        Build the prediction response from a cached (category, probabilities) pair.
+        
+        Args:
+            result: Predicted category and class probabilities
+            
+        Returns:
+            Dict with prediction results
+        """
+        prediction, probs = result
         
         # Create probability dict
         prob_dict = {}
         for i, category in enumerate(self.CATEGORY_CLASSES):
-            prob_dict[category] = float(probs[i]) if i < len(probs) else 0.0
+            prob_dict[category] = probs[i] if i < len(probs) else 0.0
         
         return {
             'predicted_category': prediction,
-            'confidence': float(max(probs)),
+            'confidence': max(probs),
             'probabilities': prob_dict,
             'model_used': self.model_type
         }
     
+    def start_prediction_batcher(self) -> None:
+        """
+        Start the background task that coalesces concurrent predictions.
+        
+        Without it each uncached prediction runs on its own.
+        """
+        if self._predict_worker is not None:
+            return
+        self._predict_queue = asyncio.Queue()
+        self._predict_worker = asyncio.create_task(self._run_prediction_batcher())
+        logger.info("Started ML prediction batcher")
+    
+    async def stop_prediction_batcher(self) -> None:
+        """Stop the prediction batcher, answering any predictions still queued."""
+        if self._predict_worker is None:
+            return
+        queue, worker = self._predict_queue, self._predict_worker
+        self._predict_queue = None
+        self._predict_worker = None
+        # The sentinel makes the worker answer the batch it is collecting
+        # and exit; cancelling it would drop that batch unresolved
+        await queue.put(None)
+        await worker
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        if pending:
+            await self._predict_batch(pending)
+    
+    async def _run_prediction_batcher(self) -> None:
+        """Drain queued predictions in batches until a None sentinel arrives."""
+        loop = asyncio.get_running_loop()
+        queue = self._predict_queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.PREDICT_BATCH_WINDOW_SECONDS
+            while len(batch) < self.PREDICT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._predict_batch(batch)
+    
+    async def _predict_batch(
+        self,
+        batch: List[Tuple[Tuple[float, ...], asyncio.Future]]
+    ) -> None:
+        """
+        Run one model call for a batch of queued predictions.
+        
+        Args:
+            batch: (feature key, future) pairs; each future gets its
+                (category, probabilities) result or the prediction error
+        """
+        keys = [key for key, _ in batch]
+        try:
+            results = await asyncio.to_thread(self._predict_keys, keys)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (key, future), result in zip(batch, results):
+            self._remember_prediction(key, result)
+            if not future.done():
+                future.set_result(result)
+    
+    def _predict_keys(
+        self,
+        keys: List[Tuple[float, ...]]
+    ) -> List[Tuple[str, Tuple[float, ...]]]:
+        """
+        Predict many rounded feature tuples with one model call.
+        
+        Args:
+            keys: Feature tuples in predict_single argument order, which is
+                the preprocessor's FEATURE_COLUMNS order
+            
+        Returns:
+            (category, probabilities) per key
+        """
+        X = self.preprocessor.prepare_array_input(keys)
+        predictions, probabilities = self.predict(X)
+        return list(zip(predictions.tolist(), map(tuple, probabilities.tolist())))
+    
     def save_model(self, path: Optional[str] = None) -> None:
         """
         Save trained model to disk.
@@ -366,10 +794,14 @@ class MLClassifier:
             'model': self.model,
             'model_type': self.model_type,
             'accuracy': self.training_accuracy,
-            'classes': self.CATEGORY_CLASSES
+            'guard_model': self.guard_model if self.guard_model is not self.model else None,
+            'classes': self.CATEGORY_CLASSES,
+            'label_codes': self.LABEL_CODES
         }
         
-        joblib.dump(save_data, save_path)
+        # zlib level 3 roughly halves a 100-tree forest on disk, which makes the
+        # cold-start load cheaper than reading the raw pickle
+        joblib.dump(save_data, save_path, compress=3)
         logger.info(f"Saved model to {save_path}")
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -417,8 +849,10 @@ class MLClassifier:
         return None
 
 
-# Singleton instance
+# Singleton instance; the lock keeps concurrent first calls from each
+# building (and loading from disk) their own copy
 _classifier_instance = None
+_classifier_lock = threading.Lock()
 
 
 def get_classifier() -> MLClassifier:
@@ -430,5 +864,7 @@ def get_classifier() -> MLClassifier:
     """
     global _classifier_instance
     if _classifier_instance is None:
-        _classifier_instance = MLClassifier()
+        with _classifier_lock:
+            if _classifier_instance is None:
+                _classifier_instance = MLClassifier()
     return _classifier_instance
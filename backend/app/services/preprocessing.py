@@ -6,13 +6,16 @@ for the Fake Productivity Detector ML pipeline.
 """
 
 import logging
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from pathlib import Path
 import joblib
 
+from ..config import ProductivityCategory
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,8 +39,41 @@ class DataPreprocessor:
         'tasks_completed'
     ]
     
+    # Valid (min, max) range per feature
+    FEATURE_RANGES = {
+        'task_hours': (0, 24),
+        'idle_hours': (0, 24),
+        'social_media_usage': (0, 24),
+        'break_frequency': (0, 50),
+        'tasks_completed': (0, 100)
+    }
+    
+    # The same ranges as arrays in FEATURE_COLUMNS order, for NumPy clipping
+    _RANGE_MINS, _RANGE_MAXS = np.array(
+        list(map(FEATURE_RANGES.get, FEATURE_COLUMNS)), dtype=np.float64
+    ).T
+    
+    # Accepted spellings of each feature column, in order of preference
+    COLUMN_VARIATIONS = {
+        'task_hours': ['task_hours', 'taskhours', 'productive_hours'],
+        'idle_hours': ['idle_hours', 'idlehours', 'idle_time'],
+        'social_media_usage': ['social_media_usage', 'social_media_hours', 'social_media', 'socialmedia'],
+        'break_frequency': ['break_frequency', 'breakfrequency', 'breaks', 'break_count'],
+        'tasks_completed': ['tasks_completed', 'taskscompleted', 'completed_tasks', 'task_count']
+    }
+    
     TARGET_COLUMN = 'productivity_category'
     
+    # Fixed label order (same as MLClassifier.CATEGORY_CLASSES); codes are
+    # positions in this list
+    CATEGORY_CLASSES = [
+        ProductivityCategory.FAKE_PRODUCTIVITY,
+        ProductivityCategory.MODERATELY_PRODUCTIVE,
+        ProductivityCategory.HIGHLY_PRODUCTIVE
+    ]
+    _LABEL_CODES = {category: code for code, category in enumerate(CATEGORY_CLASSES)}
+    _LABEL_NAMES = np.array(CATEGORY_CLASSES, dtype=object)
+    
     def __init__(self, scaler_path: Optional[str] = None):
         """
         Initialize preprocessor.
@@ -46,10 +82,13 @@ class DataPreprocessor:
             scaler_path: Path to saved scaler (if loading existing)
         """
         self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
         self.is_fitted = False
         self.scaler_path = scaler_path or "app/ml/scaler.pkl"
         
+        # Per-feature (min, max, mean, scale) as Python floats for
+        # prepare_single_input; rebuilt whenever the scaler changes
+        self._single_input_params: Optional[List[Tuple[float, float, float, float]]] = None
+        
         # Try to load existing scaler
         self._try_load_scaler()
     
@@ -65,6 +104,7 @@ class DataPreprocessor:
             if scaler_file.exists():
                 self.scaler = joblib.load(scaler_file)
                 self.is_fitted = True
+                self._single_input_params = None
                 logger.info(f"Loaded existing scaler from {self.scaler_path}")
                 return True
         except Exception as e:
@@ -127,31 +167,28 @@ class DataPreprocessor:
         # Standardize column names
         df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
         
-        # Handle column name variations
-        column_mapping = {
-            'task_hours': ['task_hours', 'taskhours', 'productive_hours'],
-            'idle_hours': ['idle_hours', 'idlehours', 'idle_time'],
-            'social_media_usage': ['social_media_usage', 'social_media_hours', 'social_media', 'socialmedia'],
-            'break_frequency': ['break_frequency', 'breakfrequency', 'breaks', 'break_count'],
-            'tasks_completed': ['tasks_completed', 'taskscompleted', 'completed_tasks', 'task_count']
-        }
-        
-        for standard_name, variations in column_mapping.items():
+        # Handle column name variations: the first variation present is
+        # renamed, unless the standard name is already there
+        present = set(df.columns)
+        renames = {}
+        for standard_name, variations in self.COLUMN_VARIATIONS.items():
+            if standard_name in present:
+                continue
             for var in variations:
-                if var in df.columns and standard_name not in df.columns:
-                    df.rename(columns={var: standard_name}, inplace=True)
+                if var in present:
+                    renames[var] = standard_name
                     break
+        if renames:
+            df.rename(columns=renames, inplace=True)
         
         # Convert to numeric, coercing errors
         for col in self.FEATURE_COLUMNS:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
         
-        # Handle missing values
-        df = self.handle_missing_values(df)
-        
-        # Clip values to valid ranges
-        df = self.clip_values(df)
+        # Handle missing values and clip to valid ranges on the copy made above
+        self._fill_missing_inplace(df, 'median')
+        self._clip_inplace(df)
         
         # Remove duplicates
         df = df.drop_duplicates()
@@ -175,21 +212,29 @@ class DataPreprocessor:
             DataFrame with imputed values
         """
         df = df.copy()
+        self._fill_missing_inplace(df, strategy)
+        return df
+    
+    def _fill_missing_inplace(self, df: pd.DataFrame, strategy: str) -> None:
+        """
+        Impute missing feature values without copying the DataFrame.
         
-        for col in self.FEATURE_COLUMNS:
-            if col in df.columns:
-                if df[col].isna().any():
-                    if strategy == 'mean':
-                        fill_value = df[col].mean()
-                    elif strategy == 'median':
-                        fill_value = df[col].median()
-                    else:
-                        fill_value = 0
-                    
-                    df[col].fillna(fill_value, inplace=True)
-                    logger.debug(f"Imputed {col} with {strategy}: {fill_value}")
+        Args:
+            df: DataFrame to modify
+            strategy: Imputation strategy ('mean', 'median', 'zero')
+        """
+        cols = [col for col in self.FEATURE_COLUMNS if col in df.columns]
+        if not cols:
+            return
         
-        return df
+        # One reduction over the feature block gives every column's fill value
+        if strategy in ('mean', 'median'):
+            fill_values = df[cols].agg(strategy)
+        else:
+            fill_values = 0
+        
+        df[cols] = df[cols].fillna(fill_values)
+        logger.debug(f"Imputed missing {cols} with {strategy}")
     
     def clip_values(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -202,21 +247,23 @@ class DataPreprocessor:
             DataFrame with clipped values
         """
         df = df.copy()
+        self._clip_inplace(df)
+        return df
+    
+    def _clip_inplace(self, df: pd.DataFrame) -> None:
+        """
+        Clip feature values to valid ranges without copying the DataFrame.
         
-        # Define valid ranges
-        ranges = {
-            'task_hours': (0, 24),
-            'idle_hours': (0, 24),
-            'social_media_usage': (0, 24),
-            'break_frequency': (0, 50),
-            'tasks_completed': (0, 100)
-        }
-        
-        for col, (min_val, max_val) in ranges.items():
-            if col in df.columns:
-                df[col] = df[col].clip(min_val, max_val)
+        Args:
+            df: DataFrame to modify
+        """
+        cols = [col for col in self.FEATURE_COLUMNS if col in df.columns]
+        if not cols:
+            return
         
-        return df
+        lower = pd.Series({col: self.FEATURE_RANGES[col][0] for col in cols})
+        upper = pd.Series({col: self.FEATURE_RANGES[col][1] for col in cols})
+        df[cols] = df[cols].clip(lower=lower, upper=upper, axis=1)
     
     def fit_transform(
         self,
@@ -243,6 +290,7 @@ class DataPreprocessor:
         if fit:
             X_scaled = self.scaler.fit_transform(X)
             self.is_fitted = True
+            self._single_input_params = None
             logger.info("Fitted and transformed features")
         else:
             if not self.is_fitted:
@@ -275,6 +323,11 @@ class DataPreprocessor:
         """
         Prepare a single data point for prediction.
         
+        Clips and scales the five values as Python floats and builds the
+        1x5 array once at the end; for a single row this beats both a
+        one-row DataFrame and separate NumPy clip/subtract/divide calls,
+        with the same float64 results.
+        
         Args:
             task_hours: Hours on tasks
             idle_hours: Idle hours
@@ -285,23 +338,89 @@ class DataPreprocessor:
         Returns:
             Scaled feature array for prediction
         """
-        data = {
-            'task_hours': [task_hours],
-            'idle_hours': [idle_hours],
-            'social_media_usage': [social_media_usage],
-            'break_frequency': [break_frequency],
-            'tasks_completed': [tasks_completed]
-        }
+        if not self.is_fitted:
+            logger.warning("Scaler not fitted, returning unscaled features")
+        
+        features = (task_hours, idle_hours, social_media_usage, break_frequency, tasks_completed)
+        return np.array([[
+            (min(max(value, low), high) - mean) / scale
+            for value, (low, high, mean, scale) in zip(features, self._get_single_input_params())
+        ]], dtype=np.float64)
+    
+    def _get_single_input_params(self) -> List[Tuple[float, float, float, float]]:
+        """
+        Get per-feature clip bounds and scaler parameters as Python floats.
+        
+        An unfitted (or mean/std-disabled) scaler contributes mean 0 and
+        scale 1, so the same expression covers every case.
+        
+        Returns:
+            (min, max, mean, scale) per feature, in FEATURE_COLUMNS order
+        """
+        if self._single_input_params is None:
+            n_features = len(self.FEATURE_COLUMNS)
+            fitted = self.is_fitted
+            means = self.scaler.mean_ if fitted and self.scaler.with_mean else np.zeros(n_features)
+            scales = self.scaler.scale_ if fitted and self.scaler.with_std else np.ones(n_features)
+            self._single_input_params = list(zip(
+                self._RANGE_MINS.tolist(), self._RANGE_MAXS.tolist(),
+                np.asarray(means, dtype=np.float64).tolist(),
+                np.asarray(scales, dtype=np.float64).tolist()
+            ))
+        return self._single_input_params
+    
+    def prepare_batch_input(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Prepare many data points for prediction in one pass.
         
-        df = pd.DataFrame(data)
-        df = self.clip_values(df)
+        Args:
+            df: DataFrame with all FEATURE_COLUMNS
+            
+        Returns:
+            Scaled feature array for prediction, one row per input row
+        """
+        return self.prepare_array_input(df[self.FEATURE_COLUMNS])
+    
+    def prepare_array_input(self, X) -> np.ndarray:
+        """
+        Prepare rows that are already in FEATURE_COLUMNS order, without pandas.
+        
+        Args:
+            X: 2-D array-like of feature values, one row per data point
+            
+        Returns:
+            Scaled feature array for prediction
+        """
+        # Own float64 copy, so clipping and scaling can work in place
+        X = np.array(X, dtype=np.float64)
+        np.clip(X, self._RANGE_MINS, self._RANGE_MAXS, out=X)
         
         if self.is_fitted:
-            return self.scaler.transform(df[self.FEATURE_COLUMNS].values)
+            return self._scale_inplace(X)
         else:
             # If not fitted, return unscaled (model should handle)
             logger.warning("Scaler not fitted, returning unscaled features")
-            return df[self.FEATURE_COLUMNS].values
+            return X
+    
+    def _scale_inplace(self, X: np.ndarray) -> np.ndarray:
+        """
+        Apply the fitted scaler to a float64 feature array in place.
+        
+        Same arithmetic as StandardScaler.transform (subtract mean_, divide by
+        scale_), minus its input validation and defensive copy; callers pass
+        arrays they own.
+        
+        Args:
+            X: Float64 array with columns in FEATURE_COLUMNS order
+            
+        Returns:
+            X, scaled
+        """
+        if self.scaler.with_mean:
+            X -= self.scaler.mean_
+        if self.scaler.with_std:
+            X /= self.scaler.scale_
+        return X
     
     def encode_labels(
         self,
@@ -311,16 +430,23 @@ class DataPreprocessor:
         """
         Encode categorical labels to integers.
         
+        Uses the fixed CATEGORY_CLASSES order, so there is nothing to fit.
+        
         Args:
             labels: Series of category labels
-            fit: Whether to fit the encoder
+            fit: Kept for compatibility; ignored
             
         Returns:
-            Encoded label array
+            int8 label array
+            
+        Raises:
+            ValueError: If a label is not a known category
         """
-        if fit:
-            return self.label_encoder.fit_transform(labels)
-        return self.label_encoder.transform(labels)
+        codes = pd.Series(labels).map(self._LABEL_CODES)
+        if codes.isna().any():
+            unknown = sorted(set(pd.Series(labels)[codes.isna()].astype(str)))
+            raise ValueError(f"Unknown labels: {unknown}")
+        return codes.to_numpy(dtype=np.int8)
     
     def decode_labels(self, encoded: np.ndarray) -> np.ndarray:
         """
@@ -332,7 +458,7 @@ class DataPreprocessor:
         Returns:
             Array of category strings
         """
-        return self.label_encoder.inverse_transform(encoded)
+        return self._LABEL_NAMES[np.asarray(encoded)]
     
     def get_feature_statistics(self, df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
         """
@@ -358,8 +484,9 @@ class DataPreprocessor:
         return stats
 
 
-# Singleton instance
+# Singleton instance, created under a lock so racing first callers share one
 _preprocessor_instance = None
+_preprocessor_lock = threading.Lock()
 
 
 def get_preprocessor() -> DataPreprocessor:
@@ -371,5 +498,7 @@ def get_preprocessor() -> DataPreprocessor:
     """
     global _preprocessor_instance
     if _preprocessor_instance is None:
-        _preprocessor_instance = DataPreprocessor()
+        with _preprocessor_lock:
+            if _preprocessor_instance is None:
+                _preprocessor_instance = DataPreprocessor()
     return _preprocessor_instance
@@ -6,15 +6,36 @@ for the Fake Productivity Detector.
 """
 
 import logging
+from bisect import bisect_right
 from typing import Dict, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
 
 from ..config import ScoringConfig, ProductivityCategory
 
 logger = logging.getLogger(__name__)
 
+# Ascending category minimum scores and the label each one starts; a score
+# belongs to CATEGORIES[bisect_right(THRESHOLDS, score)]
+_CATEGORY_THRESHOLD_VALUES = (
+    ScoringConfig.MODERATELY_PRODUCTIVE_MIN,
+    ScoringConfig.HIGHLY_PRODUCTIVE_MIN,
+)
+_CATEGORY_LABEL_VALUES = (
+    ProductivityCategory.FAKE_PRODUCTIVITY,
+    ProductivityCategory.MODERATELY_PRODUCTIVE,
+    ProductivityCategory.HIGHLY_PRODUCTIVE,
+)
+
+# The same tables as arrays, for np.searchsorted in the batch path
+_CATEGORY_THRESHOLDS = np.array(_CATEGORY_THRESHOLD_VALUES, dtype=np.float64)
+_CATEGORY_LABELS = np.array(_CATEGORY_LABEL_VALUES, dtype=object)
+
 
-@dataclass
+@dataclass(slots=True)
 class ScoringResult:
     """
     Result of productivity score calculation.
@@ -46,6 +67,9 @@ class ProductivityScorer:
     def __init__(self):
         """Initialize scorer with configuration."""
         self.config = ScoringConfig()
+        # Explanations are a pure function of the inputs; typed so that 8 and
+        # 8.0, which are echoed differently, get their own entries
+        self._cached_explanation = lru_cache(maxsize=1024, typed=True)(self._build_explanation)
     
     def calculate_score(
         self,
@@ -104,10 +128,12 @@ class ProductivityScorer:
             "break_penalty": round(-break_penalty, 2)
         }
         
-        logger.debug(
-            f"Calculated score: {normalized_score:.2f} "
-            f"(raw: {raw_score:.2f}) - {category}"
-        )
+        # Skip formatting the message on every request unless it is logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Calculated score: {normalized_score:.2f} "
+                f"(raw: {raw_score:.2f}) - {category}"
+            )
         
         return ScoringResult(
             score=round(normalized_score, 2),
@@ -116,6 +142,54 @@ class ProductivityScorer:
             raw_score=round(raw_score, 2)
         )
     
+    def calculate_score_batch(
+        self,
+        df: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Calculate productivity scores for every row of a DataFrame at once.
+        
+        Applies the same formula as calculate_score column-wise, so large
+        CSV uploads avoid a Python-level call per row.
+        
+        Args:
+            df: DataFrame with task_hours, idle_hours, social_media_usage,
+                break_frequency and tasks_completed columns
+            
+        Returns:
+            Tuple of (scores, categories, breakdown) where breakdown maps
+            productive/idle/social/breaks to per-row arrays
+        """
+        task_hours = df['task_hours'].to_numpy(dtype=np.float64)
+        idle_hours = df['idle_hours'].to_numpy(dtype=np.float64)
+        social_media_hours = df['social_media_usage'].to_numpy(dtype=np.float64)
+        break_frequency = df['break_frequency'].to_numpy(dtype=np.float64)
+        tasks_completed = df['tasks_completed'].to_numpy(dtype=np.float64)
+        
+        # Accumulate in one buffer instead of a temporary per term
+        raw_scores = task_hours * self.config.TASK_WEIGHT
+        raw_scores += tasks_completed * self.config.TASKS_COMPLETED_WEIGHT
+        raw_scores -= idle_hours * self.config.IDLE_WEIGHT
+        raw_scores -= social_media_hours * self.config.SOCIAL_MEDIA_WEIGHT
+        raw_scores -= break_frequency * self.config.BREAK_WEIGHT
+        normalized = np.clip(
+            raw_scores, self.config.MIN_SCORE, self.config.MAX_SCORE, out=raw_scores
+        )
+        
+        # Classify on the unrounded score, as calculate_score does
+        categories = _CATEGORY_LABELS[
+            np.searchsorted(_CATEGORY_THRESHOLDS, normalized, side='right')
+        ]
+        
+        breakdown = {
+            "productive": np.round(task_hours, 2),
+            "idle": np.round(idle_hours, 2),
+            "social": np.round(social_media_hours, 2),
+            "breaks": np.round(break_frequency / 2, 2)
+        }
+        
+        return np.round(normalized, 2), categories, breakdown
+    
     def _normalize_score(self, raw_score: float) -> float:
         """
         Normalize raw score to 0-100 range.
@@ -126,10 +200,10 @@ class ProductivityScorer:
         Returns:
             float: Normalized score between 0 and 100
         """
-        return max(
-            self.config.MIN_SCORE,
-            min(self.config.MAX_SCORE, raw_score)
-        )
+        # Same result as max(MIN, min(MAX, raw)), NaN included, without
+        # the two builtin calls
+        capped = raw_score if raw_score < self.config.MAX_SCORE else self.config.MAX_SCORE
+        return capped if capped > self.config.MIN_SCORE else self.config.MIN_SCORE
     
     def _classify_category(self, score: float) -> str:
         """
@@ -141,12 +215,8 @@ class ProductivityScorer:
         Returns:
             str: Productivity category label
         """
-        if score >= self.config.HIGHLY_PRODUCTIVE_MIN:
-            return ProductivityCategory.HIGHLY_PRODUCTIVE
-        elif score >= self.config.MODERATELY_PRODUCTIVE_MIN:
-            return ProductivityCategory.MODERATELY_PRODUCTIVE
-        else:
-            return ProductivityCategory.FAKE_PRODUCTIVITY
+        # A score equal to a category minimum belongs to that category
+        return _CATEGORY_LABEL_VALUES[bisect_right(_CATEGORY_THRESHOLD_VALUES, score)]
     
     def get_category_thresholds(self) -> Dict[str, Tuple[float, float]]:
         """
@@ -181,6 +251,34 @@ class ProductivityScorer:
         """
         Generate human-readable explanation of score calculation.
         
+        Args:
+            task_hours: Hours spent on productive tasks
+            idle_hours: Hours spent idle
+            social_media_hours: Hours spent on social media
+            break_frequency: Number of breaks taken
+            tasks_completed: Number of tasks completed
+            
+        Returns:
+            str: Detailed explanation of score calculation
+        """
+        return self._cached_explanation(
+            task_hours, idle_hours, social_media_hours,
+            break_frequency, tasks_completed
+        )
+    
+    def _build_explanation(
+        self,
+        task_hours: float,
+        idle_hours: float,
+        social_media_hours: float,
+        break_frequency: int,
+        tasks_completed: int
+    ) -> str:
+        """
+        Build the explanation for one set of inputs.
+        
+        Wrapped in an LRU cache per scorer by explain_score.
+        
         Args:
             task_hours: Hours spent on productive tasks
             idle_hours: Hours spent idle
@@ -228,8 +326,8 @@ Category: {result.category}
         return explanation.strip()
 
 
-# Singleton instance
-_scorer_instance = None
+# Singleton instance, built at import; construction only reads constants
+_scorer_instance = ProductivityScorer()
 
 
 def get_scorer() -> ProductivityScorer:
@@ -239,7 +337,4 @@ def get_scorer() -> ProductivityScorer:
     Returns:
         ProductivityScorer: Scorer instance
     """
-    global _scorer_instance
-    if _scorer_instance is None:
-        _scorer_instance = ProductivityScorer()
     return _scorer_instance
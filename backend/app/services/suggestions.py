@@ -6,15 +6,82 @@ based on productivity analysis results.
 """
 
 import logging
-from typing import Dict, List, Tuple
+import operator
+from typing import Callable, List, Tuple
 from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
 
 from ..config import ProductivityCategory
 
 logger = logging.getLogger(__name__)
 
+# Metrics a rule condition can name, in the order they are passed to _check_rules
+_METRIC_ORDER = (
+    "idle_hours",
+    "social_media_usage",
+    "break_frequency",
+    "task_hours",
+    "tasks_completed",
+    "efficiency_ratio",
+    "score"
+)
+_METRIC_INDEX = {name: index for index, name in enumerate(_METRIC_ORDER)}
+
+# Fallback suggestions when no rule fires, by score band
+_DEFAULT_SUGGESTIONS_HIGH = (
+    "Excellent work! Maintain your current productivity habits.",
+    "Consider mentoring others with your productivity strategies.",
+    "Challenge yourself with more ambitious goals."
+)
+_DEFAULT_SUGGESTIONS_MID = (
+    "Good progress! Focus on consistency to improve further.",
+    "Try identifying your peak productivity hours.",
+    "Set specific goals for each work session."
+)
+_DEFAULT_SUGGESTIONS_LOW = (
+    "Start with small improvements - even 10% better is progress.",
+    "Identify your biggest time wasters and address them first.",
+    "Consider using productivity apps to track your time.",
+    "Set realistic daily goals and celebrate small wins."
+)
+
+# Tips per productivity category; unknown categories get the moderate tips
+_CATEGORY_TIPS = {
+    ProductivityCategory.HIGHLY_PRODUCTIVE: (
+        "Share your productivity strategies with colleagues",
+        "Consider taking on leadership roles in team projects",
+        "Mentor others who are struggling with productivity",
+        "Document your workflow for future reference"
+    ),
+    ProductivityCategory.MODERATELY_PRODUCTIVE: (
+        "You're on the right track - focus on consistency",
+        "Identify your top 3 time wasters and address them",
+        "Try time-blocking your most important tasks",
+        "Review your productivity weekly and adjust"
+    ),
+    ProductivityCategory.FAKE_PRODUCTIVITY: (
+        "Start fresh with a simple daily planning routine",
+        "Focus on completing one task before starting another",
+        "Use the 2-minute rule: if it takes 2 minutes, do it now",
+        "Set up your environment to minimize distractions",
+        "Consider an accountability partner or productivity coach"
+    )
+}
+
+# Rule comparison names and the operators implementing them; these work on
+# scalars and element-wise on NumPy arrays alike
+_COMPARATORS = {
+    "gt": operator.gt,
+    "lt": operator.lt,
+    "gte": operator.ge,
+    "lte": operator.le,
+    "eq": operator.eq
+}
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class SuggestionRule:
     """
     Rule for generating suggestions.
@@ -46,6 +113,16 @@ class SuggestionEngine:
     def __init__(self):
         """Initialize suggestion engine with rules."""
         self.rules = self._create_rules()
+        # Stable sort keeps rule order within a priority level
+        self._rules_by_priority = sorted(self.rules, key=lambda rule: rule.priority)
+        # (metric index, threshold, comparator) per rule in priority order,
+        # resolved once
+        self._rule_checks = [
+            (_METRIC_INDEX.get(rule.condition), rule.threshold, _COMPARATORS.get(rule.comparison))
+            for rule in self._rules_by_priority
+        ]
+        # Suggestions are a pure function of the inputs; repeated rows skip the rules
+        self._cached_suggestions = lru_cache(maxsize=8192)(self._build_suggestions)
     
     def _create_rules(self) -> List[SuggestionRule]:
         """
@@ -215,79 +292,164 @@ class SuggestionEngine:
         Returns:
             List of suggestion strings
         """
-        triggered_suggestions: List[Tuple[int, str, str]] = []  # (priority, category, suggestion)
+        suggestions = self._cached_suggestions(
+            task_hours, idle_hours, social_media_usage,
+            break_frequency, tasks_completed, score
+        )
+        return list(suggestions[:max_suggestions])
+    
+    def _build_suggestions(
+        self,
+        task_hours: float,
+        idle_hours: float,
+        social_media_usage: float,
+        break_frequency: int,
+        tasks_completed: int,
+        score: float
+    ) -> Tuple[str, ...]:
+        """
+        Evaluate the rules for one set of inputs.
         
-        # Calculate efficiency ratio
-        efficiency_ratio = tasks_completed / max(task_hours, 1) if task_hours > 0 else 0
+        Wrapped in an LRU cache per engine; returns a tuple so cached
+        results cannot be mutated by callers.
         
-        # Check each rule
-        metrics = {
-            "idle_hours": idle_hours,
-            "social_media_usage": social_media_usage,
-            "break_frequency": break_frequency,
-            "task_hours": task_hours,
-            "tasks_completed": tasks_completed,
-            "efficiency_ratio": efficiency_ratio,
-            "score": score
-        }
+        Args:
+            task_hours: Hours spent on tasks
+            idle_hours: Hours spent idle
+            social_media_usage: Hours on social media
+            break_frequency: Number of breaks
+            tasks_completed: Number of tasks completed
+            score: Calculated productivity score
         
-        for rule in self.rules:
-            if self._check_rule(rule, metrics):
-                triggered_suggestions.append(
-                    (rule.priority, rule.category, rule.suggestion)
-                )
+        Returns:
+            All selected suggestions, highest priority first
+        """
+        # Calculate efficiency ratio
+        efficiency_ratio = tasks_completed / max(task_hours, 1) if task_hours > 0 else 0
         
-        # Sort by priority (lower = higher priority)
-        triggered_suggestions.sort(key=lambda x: x[0])
+        # Check each rule; values in _METRIC_ORDER
+        metrics = (
+            idle_hours, social_media_usage, break_frequency,
+            task_hours, tasks_completed, efficiency_ratio, score
+        )
         
-        # Remove duplicates from same category, keeping highest priority
-        seen_categories = set()
-        unique_suggestions = []
+        def is_triggered(position: int) -> bool:
+            index, threshold, compare = self._rule_checks[position]
+            return compare is not None and index is not None and compare(metrics[index], threshold)
         
-        for priority, category, suggestion in triggered_suggestions:
-            if category not in seen_categories or category == "positive":
-                unique_suggestions.append(suggestion)
-                seen_categories.add(category)
+        # Rules are only evaluated if their category can still contribute
+        unique_suggestions = self._select_suggestions(is_triggered)
         
         # Add default suggestions if none triggered
         if not unique_suggestions:
             unique_suggestions = self._get_default_suggestions(score)
         
-        # Limit number of suggestions
-        return unique_suggestions[:max_suggestions]
+        return tuple(unique_suggestions)
     
-    def _check_rule(
+    def generate_suggestions_batch(
         self,
-        rule: SuggestionRule,
-        metrics: Dict[str, float]
-    ) -> bool:
+        task_hours: np.ndarray,
+        idle_hours: np.ndarray,
+        social_media_usage: np.ndarray,
+        break_frequency: np.ndarray,
+        tasks_completed: np.ndarray,
+        scores: np.ndarray,
+        max_suggestions: int = 5
+    ) -> List[List[str]]:
         """
-        Check if a rule condition is met.
+        Generate suggestions for many rows at once.
+        
+        Rules are evaluated as boolean masks over whole columns, and each
+        distinct combination of triggered rules is resolved only once.
         
         Args:
-            rule: Rule to check
-            metrics: Dict of metric values
+            task_hours: Hours spent on tasks, per row
+            idle_hours: Hours spent idle, per row
+            social_media_usage: Hours on social media, per row
+            break_frequency: Number of breaks, per row
+            tasks_completed: Number of tasks completed, per row
+            scores: Calculated productivity scores, per row
+            max_suggestions: Maximum number of suggestions per row
+        
+        Returns:
+            List of suggestion lists, one per row
+        """
+        task_hours = np.asarray(task_hours, dtype=np.float64)
+        tasks_completed = np.asarray(tasks_completed, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float64)
+        
+        if len(scores) == 0:
+            return []
+        
+        metrics = (
+            np.asarray(idle_hours, dtype=np.float64),
+            np.asarray(social_media_usage, dtype=np.float64),
+            np.asarray(break_frequency, dtype=np.float64),
+            task_hours,
+            tasks_completed,
+            np.where(task_hours > 0, tasks_completed / np.maximum(task_hours, 1), 0.0),
+            scores
+        )
+        
+        # One row per input row, one column per rule in priority order
+        masks = np.column_stack([
+            np.broadcast_to(triggered, scores.shape)
+            for triggered in self._check_rules(metrics)
+        ])
+        patterns, inverse = np.unique(masks, axis=0, return_inverse=True)
+        resolved = [self._select_suggestions(pattern.tolist().__getitem__) for pattern in patterns]
+        
+        return [
+            list((resolved[pattern] or self._get_default_suggestions(score))[:max_suggestions])
+            for pattern, score in zip(inverse.ravel().tolist(), scores.tolist())
+        ]
+    
+    def _select_suggestions(self, is_triggered: Callable[[int], bool]) -> List[str]:
+        """
+        Pick suggestions for triggered rules, one per category.
+        
+        Rules whose category already produced a suggestion are skipped
+        without calling is_triggered.
+        
+        Args:
+            is_triggered: Called with a rule's position in priority order;
+                returns whether that rule's condition is met
             
         Returns:
-            True if condition is met
+            List of suggestion strings, highest priority first
         """
-        if rule.condition not in metrics:
-            return False
+        # Remove duplicates from same category, keeping highest priority
+        seen_categories = set()
+        unique_suggestions = []
         
-        value = metrics[rule.condition]
-        threshold = rule.threshold
+        for position, rule in enumerate(self._rules_by_priority):
+            if rule.category in seen_categories and rule.category != "positive":
+                continue
+            if is_triggered(position):
+                unique_suggestions.append(rule.suggestion)
+                seen_categories.add(rule.category)
         
-        comparisons = {
-            "gt": value > threshold,
-            "lt": value < threshold,
-            "gte": value >= threshold,
-            "lte": value <= threshold,
-            "eq": value == threshold
-        }
+        return unique_suggestions
+    
+    def _check_rules(self, metrics: Tuple[float, ...]) -> List[bool]:
+        """
+        Check every rule condition against the metrics.
         
-        return comparisons.get(rule.comparison, False)
+        Args:
+            metrics: Metric values in _METRIC_ORDER (scalars, or arrays
+                for a batch)
+            
+        Returns:
+            Flags (or boolean arrays) aligned with rules in priority order;
+            rules with an unknown metric or comparison are never met
+        """
+        return [
+            compare(metrics[index], threshold)
+            if compare is not None and index is not None else False
+            for index, threshold, compare in self._rule_checks
+        ]
     
-    def _get_default_suggestions(self, score: float) -> List[str]:
+    def _get_default_suggestions(self, score: float) -> Tuple[str, ...]:
         """
         Get default suggestions when no specific rules triggered.
         
@@ -295,27 +457,14 @@ class SuggestionEngine:
             score: Productivity score
             
         Returns:
-            List of default suggestions
+            Shared tuple of default suggestions
         """
         if score >= 80:
-            return [
-                "Excellent work! Maintain your current productivity habits.",
-                "Consider mentoring others with your productivity strategies.",
-                "Challenge yourself with more ambitious goals."
-            ]
+            return _DEFAULT_SUGGESTIONS_HIGH
         elif score >= 50:
-            return [
-                "Good progress! Focus on consistency to improve further.",
-                "Try identifying your peak productivity hours.",
-                "Set specific goals for each work session."
-            ]
+            return _DEFAULT_SUGGESTIONS_MID
         else:
-            return [
-                "Start with small improvements - even 10% better is progress.",
-                "Identify your biggest time wasters and address them first.",
-                "Consider using productivity apps to track your time.",
-                "Set realistic daily goals and celebrate small wins."
-            ]
+            return _DEFAULT_SUGGESTIONS_LOW
     
     def get_category_specific_tips(self, category: str) -> List[str]:
         """
@@ -327,29 +476,10 @@ class SuggestionEngine:
         Returns:
             List of category-specific tips
         """
-        tips = {
-            ProductivityCategory.HIGHLY_PRODUCTIVE: [
-                "Share your productivity strategies with colleagues",
-                "Consider taking on leadership roles in team projects",
-                "Mentor others who are struggling with productivity",
-                "Document your workflow for future reference"
-            ],
-            ProductivityCategory.MODERATELY_PRODUCTIVE: [
-                "You're on the right track - focus on consistency",
-                "Identify your top 3 time wasters and address them",
-                "Try time-blocking your most important tasks",
-                "Review your productivity weekly and adjust"
-            ],
-            ProductivityCategory.FAKE_PRODUCTIVITY: [
-                "Start fresh with a simple daily planning routine",
-                "Focus on completing one task before starting another",
-                "Use the 2-minute rule: if it takes 2 minutes, do it now",
-                "Set up your environment to minimize distractions",
-                "Consider an accountability partner or productivity coach"
-            ]
-        }
-        
-        return tips.get(category, tips[ProductivityCategory.MODERATELY_PRODUCTIVE])
+        tips = _CATEGORY_TIPS.get(category)
+        if tips is None:
+            tips = _CATEGORY_TIPS[ProductivityCategory.MODERATELY_PRODUCTIVE]
+        return list(tips)
     
     def get_quick_wins(
         self,
@@ -394,8 +524,8 @@ class SuggestionEngine:
         return quick_wins
 
 
-# Singleton instance
-_suggestion_engine = None
+# Singleton instance, built at import; the rule table is cheap to create
+_suggestion_engine = SuggestionEngine()
 
 
 def get_suggestion_engine() -> SuggestionEngine:
@@ -405,7 +535,4 @@ def get_suggestion_engine() -> SuggestionEngine:
     Returns:
         SuggestionEngine: Engine instance
     """
-    global _suggestion_engine
-    if _suggestion_engine is None:
-        _suggestion_engine = SuggestionEngine()
     return _suggestion_engine
@@ -5,9 +5,11 @@ Provides a FastAPI dependency that extracts and validates the access token
 from the Authorization header, then returns the authenticated user's UUID.
 """
 
+import hashlib
 import logging
 import re
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 
 from fastapi import Depends, Header, HTTPException, status
 from jose import JWTError, jwt
@@ -16,6 +18,13 @@ from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Verified tokens, keyed by a digest of the token so raw tokens are not kept
+# in memory. Each entry stores (expires_at, user_id); entries live at most
+# _TOKEN_CACHE_TTL seconds and never past the token's own exp claim.
+_TOKEN_CACHE_TTL = 300.0
+_TOKEN_CACHE_MAX = 4096
+_token_cache: Dict[bytes, Tuple[float, str]] = {}
+
 # Password validation rules (mirrors frontend logic)
 _PASSWORD_SPECIAL = re.compile(r'[!@#$%^&*()\-_+=\[\]{};:\'"\\|,.<>/?`~]')
 
@@ -73,6 +82,15 @@ async def get_current_user_id(
         logger.debug("JWT secret not set – skipping token verification")
         return "anonymous"
 
+    # Skip signature verification for tokens verified recently
+    token_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    cached = _token_cache.get(token_key)
+    if cached is not None:
+        if now < cached[0]:
+            return cached[1]
+        del _token_cache[token_key]
+
     try:
         payload = jwt.decode(
             token,
@@ -86,6 +104,12 @@ async def get_current_user_id(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token missing subject claim",
             )
+        expires_at = now + _TOKEN_CACHE_TTL
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        if len(_token_cache) >= _TOKEN_CACHE_MAX:
+            _token_cache.pop(next(iter(_token_cache)))
+        _token_cache[token_key] = (expires_at, user_id)
         return user_id
     except JWTError as exc:
         logger.warning("JWT verification failed: %s", exc)
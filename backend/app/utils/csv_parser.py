@@ -6,13 +6,19 @@ for batch productivity analysis uploads.
 """
 
 import logging
-from typing import Any, Dict, List, Optional, Tuple
-from io import StringIO
+import threading
+from functools import lru_cache
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, TextIO, Tuple, Union
+from io import BytesIO, StringIO
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Bytes that may appear in text files (printable, whitespace, and any
+# byte >= 0x80 so UTF-8 and latin-1 content passes)
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+
 
 class CSVParser:
     """
@@ -34,10 +40,70 @@ class CSVParser:
     # Minimum required columns
     MINIMUM_REQUIRED = ['task_hours', 'idle_hours']
     
+    # Bytes read from the start of an upload when sniffing its content
+    SNIFF_BYTES = 4096
+    
+    # Fixed column order for row tuples
+    ROW_COLUMNS = [
+        'task_hours', 'idle_hours', 'social_media_usage', 'break_frequency', 'tasks_completed'
+    ]
+    
+    # Value type of each ROW_COLUMNS entry in extracted rows
+    ROW_DTYPES = (np.float64, np.float64, np.float64, np.int64, np.int64)
+    
+    # Default for missing or non-numeric values, per ROW_COLUMNS entry
+    COLUMN_DEFAULTS = {
+        'task_hours': 0.0,
+        'idle_hours': 0.0,
+        'social_media_usage': 0.0,
+        'break_frequency': 0,
+        'tasks_completed': 0
+    }
+    
+    # Valid (min, max) range per ROW_COLUMNS entry
+    VALUE_RANGES = {
+        'task_hours': (0, 24),
+        'idle_hours': (0, 24),
+        'social_media_usage': (0, 24),
+        'break_frequency': (0, 50),
+        'tasks_completed': (0, 100)
+    }
+    
+    # Columns cast to int after cleaning; their ranges fit in int16
+    INT_COLUMNS = ['break_frequency', 'tasks_completed']
+    
     def __init__(self):
         """Initialize CSV parser."""
-        self.column_mapping: Dict[str, str] = {}
-        self.validation_errors: List[str] = []
+        # Per-parse state lives in thread-local storage so the shared
+        # parser can run concurrently in worker threads
+        self._state = threading.local()
+        
+        # Header names repeat across uploads, so memoize their matches and
+        # whole-header resolutions
+        self._column_matches = lru_cache(maxsize=1024)(self._match_column)
+        self._resolved_headers = lru_cache(maxsize=256)(self._resolve_header)
+    
+    @property
+    def column_mapping(self) -> Dict[str, str]:
+        """Column renames applied by the current thread's last parse."""
+        if not hasattr(self._state, 'column_mapping'):
+            self._state.column_mapping = {}
+        return self._state.column_mapping
+    
+    @column_mapping.setter
+    def column_mapping(self, value: Dict[str, str]) -> None:
+        self._state.column_mapping = value
+    
+    @property
+    def validation_errors(self) -> List[str]:
+        """Errors collected by the current thread's last parse."""
+        if not hasattr(self._state, 'validation_errors'):
+            self._state.validation_errors = []
+        return self._state.validation_errors
+    
+    @validation_errors.setter
+    def validation_errors(self, value: List[str]) -> None:
+        self._state.validation_errors = value
     
     def parse_csv_content(
         self,
@@ -54,17 +120,129 @@ class CSVParser:
         Returns:
             Tuple of (DataFrame or None, list of errors)
         """
+        return self._parse_source(StringIO(content), delimiter, 'utf-8')
+    
+    def parse_csv_file(
+        self,
+        file_obj: BinaryIO,
+        delimiter: str = ',',
+        nrows: Optional[int] = None,
+        known_columns_only: bool = False
+    ) -> Tuple[Optional[pd.DataFrame], List[str]]:
+        """
+        Parse CSV content straight from a binary file object.
+        
+        pandas reads the file incrementally, so the upload is never held
+        in memory as one bytes object plus a decoded copy.
+        
+        Args:
+            file_obj: Seekable binary file (e.g. UploadFile.file)
+            delimiter: Column delimiter
+            nrows: Only parse this many data rows (None for all)
+            known_columns_only: Skip columns that map to no REQUIRED_COLUMNS
+                entry while reading, instead of parsing and cleaning them
+            
+        Returns:
+            Tuple of (DataFrame or None, list of errors)
+        """
+        usecols = self._is_known_column if known_columns_only else None
+        try:
+            return self._parse_source(file_obj, delimiter, 'utf-8', nrows, usecols)
+        except UnicodeDecodeError:
+            # Try UTF-8 first, then fall back to latin-1
+            file_obj.seek(0)
+            return self._parse_source(file_obj, delimiter, 'latin-1', nrows, usecols)
+    
+    def looks_like_csv(self, file_obj: BinaryIO) -> bool:
+        """
+        Sniff the start of a file to see whether it is plausibly CSV text.
+        
+        Checks content rather than the client-supplied filename: the head
+        must be text (no control bytes other than whitespace) and, if not
+        empty, contain the comma delimiter. Empty files pass so the parser
+        can report them as empty.
+        
+        Args:
+            file_obj: Seekable binary file; left rewound to the start
+            
+        Returns:
+            True if the file looks like comma-separated text
+        """
+        file_obj.seek(0)
+        head = file_obj.read(self.SNIFF_BYTES)
+        file_obj.seek(0)
+        
+        if not head:
+            return True
+        return b',' in head and not head.translate(None, _TEXT_BYTES)
+    
+    def count_rows(self, file_obj: BinaryIO, delimiter: str = ',') -> int:
+        """
+        Count data rows in a CSV file, reading only its first column.
+        
+        Uses the same parser as parse_csv_file, so quoted fields spanning
+        several lines count once and blank lines are skipped.
+        
+        Args:
+            file_obj: Seekable binary file
+            delimiter: Column delimiter
+            
+        Returns:
+            Number of data rows after the header
+        """
+        file_obj.seek(0)
+        try:
+            # latin-1 decodes any byte, and the delimiter, quote and newline
+            # characters are the same in every encoding parse_csv_file accepts
+            return len(pd.read_csv(
+                file_obj, delimiter=delimiter, encoding='latin-1', usecols=[0]
+            ))
+        except pd.errors.EmptyDataError:
+            return 0
+    
+    def _parse_source(
+        self,
+        source: Union[TextIO, BinaryIO],
+        delimiter: str,
+        encoding: str,
+        nrows: Optional[int] = None,
+        usecols: Optional[Callable[[str], bool]] = None
+    ) -> Tuple[Optional[pd.DataFrame], List[str]]:
+        """
+        Parse a CSV buffer into a validated DataFrame.
+        
+        Args:
+            source: Text or binary buffer to read
+            delimiter: Column delimiter
+            encoding: Encoding used for binary buffers
+            nrows: Only parse this many data rows (None for all)
+            usecols: Predicate on raw header names selecting columns to read
+            
+        Returns:
+            Tuple of (DataFrame or None, list of errors)
+        
+        Raises:
+            UnicodeDecodeError: If a binary buffer is not valid in encoding
+        """
         self.validation_errors = []
         
         try:
             # Read CSV content
-            df = pd.read_csv(
-                StringIO(content),
-                delimiter=delimiter,
-                encoding='utf-8'
-            )
+            if nrows is None:
+                df = self._read_all(source, delimiter, encoding, usecols)
+            else:
+                # The pyarrow engine cannot stop early, so heads use the C engine
+                df = pd.read_csv(
+                    source,
+                    delimiter=delimiter,
+                    encoding=encoding,
+                    nrows=nrows,
+                    usecols=usecols
+                )
             
-            if df.empty:
+            # No columns at all means usecols matched nothing; let column
+            # validation report what is missing
+            if len(df.columns) and df.empty:
                 self.validation_errors.append("CSV file is empty")
                 return None, self.validation_errors
             
@@ -86,7 +264,7 @@ class CSVParser:
         except pd.errors.ParserError as e:
             self.validation_errors.append(f"CSV parsing error: {str(e)}")
         except UnicodeDecodeError:
-            self.validation_errors.append("CSV encoding error. Please use UTF-8 encoding.")
+            raise
         except Exception as e:
             self.validation_errors.append(f"Unexpected error: {str(e)}")
             logger.error(f"CSV parsing error: {e}")
@@ -101,6 +279,9 @@ class CSVParser:
         """
         Parse CSV content from bytes.
         
+        The bytes are read in place rather than decoded to a str first, so
+        no second copy of the upload is held while pandas parses it.
+        
         Args:
             content: CSV file content as bytes
             delimiter: Column delimiter
@@ -108,17 +289,93 @@ class CSVParser:
         Returns:
             Tuple of (DataFrame or None, list of errors)
         """
-        try:
-            # Try UTF-8 first, then fall back to latin-1
+        return self.parse_csv_file(BytesIO(content), delimiter)
+    
+    def _read_all(
+        self,
+        source: Union[TextIO, BinaryIO],
+        delimiter: str,
+        encoding: str,
+        usecols: Optional[Callable[[str], bool]] = None
+    ) -> pd.DataFrame:
+        """
+        Read a whole CSV buffer, using the multithreaded pyarrow engine if available.
+        
+        Args:
+            source: Seekable text or binary buffer to read
+            delimiter: Column delimiter
+            encoding: Encoding used for binary buffers
+            usecols: Predicate on raw header names selecting columns to read
+            
+        Returns:
+            Raw DataFrame as read from the file
+        """
+        start = source.tell()
+        
+        if usecols is not None:
+            # pyarrow only takes explicit column names, so resolve the predicate
+            # against the header first
+            header = pd.read_csv(
+                source, delimiter=delimiter, encoding=encoding, nrows=0
+            ).columns
+            source.seek(start)
+            usecols = [col for col in header if usecols(col)]
+        
+        if usecols is None or usecols:
             try:
-                decoded = content.decode('utf-8')
-            except UnicodeDecodeError:
-                decoded = content.decode('latin-1')
+                return pd.read_csv(
+                    source,
+                    delimiter=delimiter,
+                    encoding=encoding,
+                    usecols=usecols,
+                    engine='pyarrow'
+                )
+            except (ImportError, ValueError):
+                # pyarrow is optional, and anything it rejects (including bad
+                # encodings) is re-read by the C engine, which raises the
+                # errors reported to users
+                source.seek(start)
+        
+        return pd.read_csv(
+            source,
+            delimiter=delimiter,
+            encoding=encoding,
+            usecols=usecols
+        )
+    
+    def _is_known_column(self, name: str) -> bool:
+        """
+        Check whether a raw header maps to one of REQUIRED_COLUMNS.
+        
+        Uses the same normalization and matching as _standardize_columns.
+        
+        Args:
+            name: Column name as it appears in the file
             
-            return self.parse_csv_content(decoded, delimiter)
+        Returns:
+            True if the column would be mapped to a standard name
+        """
+        col = str(name).lower().strip().replace(' ', '_')
+        return bool(self._column_matches(col))
+    
+    def _match_column(self, col: str) -> Tuple[str, ...]:
+        """
+        Find the standard names a normalized column name maps to.
+        
+        A column matches a standard name if it equals one of its variations
+        or contains one as a substring.
+        
+        Args:
+            col: Lowercased column name with spaces replaced by underscores
             
-        except Exception as e:
-            return None, [f"Failed to decode CSV content: {str(e)}"]
+        Returns:
+            Matching REQUIRED_COLUMNS keys, in declaration order
+        """
+        return tuple(
+            standard_name
+            for standard_name, variations in self.REQUIRED_COLUMNS.items()
+            if col in variations or any(var in col for var in variations)
+        )
     
     def _standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -130,24 +387,48 @@ class CSVParser:
         Returns:
             DataFrame with standardized column names
         """
-        # Clean column names
-        df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
+        columns, mapping = self._resolved_headers(tuple(df.columns))
         
-        # Map columns to standard names
-        self.column_mapping = {}
+        # Copy so the cached mapping cannot be changed through column_mapping
+        self.column_mapping = dict(mapping)
         
-        for standard_name, variations in self.REQUIRED_COLUMNS.items():
-            for col in df.columns:
-                if col in variations or any(var in col for var in variations):
-                    if standard_name not in self.column_mapping:
-                        self.column_mapping[col] = standard_name
-                        break
-        
-        # Rename columns
-        df = df.rename(columns=self.column_mapping)
+        # Set the final names directly; rename would copy the data
+        df.columns = columns
         
         return df
     
+    def _resolve_header(
+        self,
+        header: Tuple[Any, ...]
+    ) -> Tuple[Tuple[Any, ...], Dict[str, str]]:
+        """
+        Work out the standardized column names for a raw header.
+        
+        Args:
+            header: Column names as read from the file
+            
+        Returns:
+            Tuple of (final column names, renames applied to the
+            cleaned names)
+        """
+        # Clean column names
+        cleaned = pd.Index(header).str.lower().str.strip().str.replace(' ', '_')
+        
+        # First column (in file order) matching each standard name
+        first_match = {}
+        for col in cleaned:
+            for standard_name in self._column_matches(col):
+                first_match.setdefault(standard_name, col)
+        
+        # Map columns to standard names; a column matching several standard
+        # names keeps the last one in REQUIRED_COLUMNS order
+        mapping = {}
+        for standard_name in self.REQUIRED_COLUMNS:
+            if standard_name in first_match:
+                mapping[first_match[standard_name]] = standard_name
+        
+        return tuple(mapping.get(col, col) for col in cleaned), mapping
+    
     def _validate_columns(self, df: pd.DataFrame) -> bool:
         """
         Validate that required columns are present.
@@ -183,13 +464,19 @@ class CSVParser:
         """
         Clean and validate data values.
         
+        Works in place: callers pass a freshly parsed frame they do not
+        reuse, so copying it would only double peak memory.
+        
         Args:
-            df: DataFrame to clean
+            df: DataFrame to clean (modified in place)
             
         Returns:
             Cleaned DataFrame
         """
-        df = df.copy()
+        # Add missing columns (filled with defaults below)
+        missing = [col for col in self.ROW_COLUMNS if col not in df.columns]
+        if missing:
+            df[missing] = np.nan
         
         # Sanitize string columns against CSV injection
         for col in df.select_dtypes(include=['object']).columns:
@@ -197,44 +484,15 @@ class CSVParser:
                 lambda x: x.lstrip("=+-@\t\r") if isinstance(x, str) else x
             )
         
-        # Define default values for missing columns
-        defaults = {
-            'task_hours': 0.0,
-            'idle_hours': 0.0,
-            'social_media_usage': 0.0,
-            'break_frequency': 0,
-            'tasks_completed': 0
-        }
-        
-        # Add missing columns with defaults
-        for col, default_val in defaults.items():
-            if col not in df.columns:
-                df[col] = default_val
-        
-        # Convert to numeric
-        numeric_columns = list(defaults.keys())
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Handle NaN values
-        for col, default_val in defaults.items():
-            df[col] = df[col].fillna(default_val)
-        
-        # Clip values to valid ranges
-        ranges = {
-            'task_hours': (0, 24),
-            'idle_hours': (0, 24),
-            'social_media_usage': (0, 24),
-            'break_frequency': (0, 50),
-            'tasks_completed': (0, 100)
-        }
-        
-        for col, (min_val, max_val) in ranges.items():
-            df[col] = df[col].clip(min_val, max_val)
+        # Convert to numeric, fill defaults and clip to valid ranges in one
+        # pass per column (np.clip is much cheaper than Series.clip)
+        for col in self.ROW_COLUMNS:
+            min_val, max_val = self.VALUE_RANGES[col]
+            values = pd.to_numeric(df[col], errors='coerce').fillna(self.COLUMN_DEFAULTS[col])
+            df[col] = np.clip(values.to_numpy(), min_val, max_val)
         
-        # Convert integer columns
-        df['break_frequency'] = df['break_frequency'].astype(int)
-        df['tasks_completed'] = df['tasks_completed'].astype(int)
+        # Convert integer columns (ROW_DTYPES widens them again on extraction)
+        df[self.INT_COLUMNS] = df[self.INT_COLUMNS].astype(np.int16)
         
         return df
     
@@ -253,14 +511,19 @@ class CSVParser:
         Returns:
             Dict containing row data
         """
-        row = df.iloc[row_index]
+        # Read single cells rather than building a row Series with iloc
+        columns = df.columns
+        task_hours, idle_hours, social_media_usage, break_frequency, tasks_completed = (
+            df[col].iat[row_index] if col in columns else 0
+            for col in self.ROW_COLUMNS
+        )
         
         return {
-            'task_hours': float(row.get('task_hours', 0)),
-            'idle_hours': float(row.get('idle_hours', 0)),
-            'social_media_usage': float(row.get('social_media_usage', 0)),
-            'break_frequency': int(row.get('break_frequency', 0)),
-            'tasks_completed': int(row.get('tasks_completed', 0))
+            'task_hours': float(task_hours),
+            'idle_hours': float(idle_hours),
+            'social_media_usage': float(social_media_usage),
+            'break_frequency': int(break_frequency),
+            'tasks_completed': int(tasks_completed)
         }
     
     def get_all_rows(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -273,10 +536,49 @@ class CSVParser:
         Returns:
             List of row data dicts
         """
-        rows = []
-        for i in range(len(df)):
-            rows.append(self.get_row_data(df, i))
-        return rows
+        columns = self.ROW_COLUMNS
+        return [dict(zip(columns, row)) for row in zip(*self._row_column_lists(df))]
+    
+    def get_all_rows_tuples(
+        self,
+        df: pd.DataFrame
+    ) -> List[Tuple[float, float, float, int, int]]:
+        """
+        Extract all rows as plain tuples in ROW_COLUMNS order.
+        
+        Cheaper than get_all_rows for hot loops that unpack each row.
+        
+        Args:
+            df: Source DataFrame
+            
+        Returns:
+            List of (task_hours, idle_hours, social_media_usage,
+            break_frequency, tasks_completed) tuples
+        """
+        return list(zip(*self._row_column_lists(df)))
+    
+    def _row_column_lists(self, df: pd.DataFrame) -> List[List[Any]]:
+        """
+        Convert the ROW_COLUMNS of a DataFrame to Python lists, one per column.
+        
+        Each column is cast once and unboxed by ndarray.tolist, which is far
+        cheaper than converting cell by cell while walking rows. Missing
+        columns read as zeros.
+        
+        Args:
+            df: Source DataFrame
+            
+        Returns:
+            Lists of Python floats/ints in ROW_COLUMNS order
+        """
+        n_rows = len(df)
+        return [
+            (
+                df[column].to_numpy(dtype=dtype) if column in df.columns
+                else np.zeros(n_rows, dtype=dtype)
+            ).tolist()
+            for column, dtype in zip(self.ROW_COLUMNS, self.ROW_DTYPES)
+        ]
     
     def get_summary_stats(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -288,23 +590,22 @@ class CSVParser:
         Returns:
             Dict of summary statistics
         """
-        numeric_cols = ['task_hours', 'idle_hours', 'social_media_usage', 
-                       'break_frequency', 'tasks_completed']
+        columns = list(df.columns)
+        present = [col for col in self.ROW_COLUMNS if col in columns]
         
         stats = {
             'total_rows': len(df),
-            'columns_found': list(df.columns),
+            'columns_found': columns,
             'column_stats': {}
         }
         
-        for col in numeric_cols:
-            if col in df.columns:
-                stats['column_stats'][col] = {
-                    'mean': round(df[col].mean(), 2),
-                    'min': round(df[col].min(), 2),
-                    'max': round(df[col].max(), 2),
-                    'std': round(df[col].std(), 2)
-                }
+        if present:
+            # One aggregation over the block; to_dict yields plain Python
+            # floats, which JSON responses can serialize (NumPy ints cannot).
+            # std is NaN for a single row, which JSON rejects, so use None
+            summary = df[present].agg(['mean', 'min', 'max', 'std']).round(2)
+            summary = summary.astype(object).where(summary.notna(), None)
+            stats['column_stats'] = summary.to_dict()
         
         return stats
     
@@ -326,8 +627,9 @@ class CSVParser:
         return template
 
 
-# Singleton instance
-_parser_instance = None
+# Singleton instance, built at import; per-parse state is thread-local,
+# so one shared parser is safe across concurrent requests
+_parser_instance = CSVParser()
 
 
 def get_csv_parser() -> CSVParser:
@@ -337,7 +639,4 @@ def get_csv_parser() -> CSVParser:
     Returns:
         CSVParser: Parser instance
     """
-    global _parser_instance
-    if _parser_instance is None:
-        _parser_instance = CSVParser()
     return _parser_instance